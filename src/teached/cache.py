@@ -0,0 +1,360 @@
+"""Cache backends for Teached Project."""
+import secrets
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from .metrics import metrics
+from .settings import settings
+
+
+class CacheBackend(ABC):
+    """Base class for the cache backends, every value is bytes."""
+
+    # Whether every worker sees the same entries.
+    shared = False
+
+    @abstractmethod
+    async def get(self: "CacheBackend", key: str) -> Optional[bytes]:
+        """Get value of a key.
+
+        Args:
+            key: The cache key.
+        """
+
+    @abstractmethod
+    async def set(self: "CacheBackend", key: str, value: bytes, ttl: int) -> None:
+        """Set value of a key.
+
+        Args:
+            key: The cache key.
+            value: The value to store.
+            ttl: Time to live in seconds.
+        """
+
+    @abstractmethod
+    async def delete(self: "CacheBackend", *keys: str) -> None:
+        """Delete keys.
+
+        Args:
+            keys: The cache keys.
+        """
+
+    def size(self: "CacheBackend") -> int:
+        """Bytes held by the backend in this worker.
+
+        Returns:
+            Size in bytes, 0 if the backend can't tell.
+        """
+        return 0
+
+
+class MemoryCache(CacheBackend):
+    """Bounded in-process LRU cache with expiry.
+
+    Every worker has its own entries and only sees its own invalidations, so
+    the entries live at most max_ttl seconds whatever ttl they are set with.
+    """
+
+    def __init__(
+        self: "MemoryCache", *, max_entries: int = 1024, max_ttl: int = 5
+    ) -> None:
+        """Set up the cache.
+
+        Args:
+            max_entries: Entries to keep before evicting the least recently used.
+            max_ttl: Maximum time to live in seconds.
+        """
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self._data: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._size = 0
+
+    async def get(self: "MemoryCache", key: str) -> Optional[bytes]:
+        """Get value of a key.
+
+        Args:
+            key: The cache key.
+
+        Examples:
+            >>> import asyncio
+            >>> from teached.cache import MemoryCache
+            >>> cache = MemoryCache(max_entries=1, max_ttl=60)
+            >>> loop = asyncio.new_event_loop()
+            >>> loop.run_until_complete(cache.set("a", b"1", ttl=60))
+            >>> loop.run_until_complete(cache.get("a"))
+            b'1'
+            >>> loop.run_until_complete(cache.set("b", b"22", ttl=60))
+            >>> loop.run_until_complete(cache.get("a")) is None
+            True
+            >>> cache.size()
+            2
+
+        Returns:
+            The value or None if it is missing or expired.
+        """
+        entry = self._data.get(key)
+
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+
+        if expires_at < time.monotonic():
+            self._pop(key)
+            return None
+
+        self._data.move_to_end(key)
+
+        return value
+
+    async def set(self: "MemoryCache", key: str, value: bytes, ttl: int) -> None:
+        """Set value of a key.
+
+        Args:
+            key: The cache key.
+            value: The value to store.
+            ttl: Time to live in seconds.
+        """
+        self._pop(key)
+
+        self._data[key] = (time.monotonic() + min(ttl, self.max_ttl), value)
+        self._size += len(value)
+
+        while len(self._data) > self.max_entries:
+            self._pop(next(iter(self._data)))
+
+    async def delete(self: "MemoryCache", *keys: str) -> None:
+        """Delete keys.
+
+        Args:
+            keys: The cache keys.
+        """
+        for key in keys:
+            self._pop(key)
+
+    def size(self: "MemoryCache") -> int:
+        """Bytes held by the cache.
+
+        Returns:
+            Size in bytes.
+        """
+        return self._size
+
+    def _pop(self: "MemoryCache", key: str) -> None:
+        """Remove a key and account for its size.
+
+        Args:
+            key: The cache key.
+        """
+        entry = self._data.pop(key, None)
+
+        if entry is not None:
+            self._size -= len(entry[1])
+
+
+class RedisCache(CacheBackend):
+    """Cache shared by every worker, backed by redis."""
+
+    shared = True
+
+    def __init__(self: "RedisCache", *, url: str) -> None:
+        """Set up the cache, the connection is opened on first use.
+
+        Args:
+            url: The redis URL.
+        """
+        self.url = url
+        self._redis: Any = None
+
+    async def _connection(self: "RedisCache") -> Any:
+        """Get redis connection pool.
+
+        Returns:
+            aioredis pool.
+        """
+        if self._redis is None:
+            import aioredis
+
+            self._redis = await aioredis.create_redis_pool(self.url)
+
+        return self._redis
+
+    async def get(self: "RedisCache", key: str) -> Optional[bytes]:
+        """Get value of a key.
+
+        Args:
+            key: The cache key.
+
+        Returns:
+            The value or None if it is missing or expired.
+        """
+        redis = await self._connection()
+        return await redis.get(key)
+
+    async def set(self: "RedisCache", key: str, value: bytes, ttl: int) -> None:
+        """Set value of a key.
+
+        Args:
+            key: The cache key.
+            value: The value to store.
+            ttl: Time to live in seconds.
+        """
+        redis = await self._connection()
+        await redis.set(key, value, expire=ttl)
+
+    async def delete(self: "RedisCache", *keys: str) -> None:
+        """Delete keys.
+
+        Args:
+            keys: The cache keys.
+        """
+        if keys:
+            redis = await self._connection()
+            await redis.delete(*keys)
+
+
+class ResponseCache:
+    """Serialized responses cache that keeps hit and size metrics.
+
+    Every key belongs to a group with a random version, the entries are
+    stored under the key and the version of its group. Invalidating a group
+    replaces its version, so a response built from the data read before the
+    change is stored under the old version and never served.
+    """
+
+    def __init__(
+        self: "ResponseCache", *, backend: CacheBackend, name: str, ttl: int
+    ) -> None:
+        """Set up the cache.
+
+        Args:
+            backend: Where the responses are stored.
+            name: Metrics and keys namespace.
+            ttl: Time to live in seconds.
+        """
+        self.backend = backend
+        self.name = name
+        self.ttl = ttl
+
+        metrics.gauge(f"{name}.bytes", backend.size)
+        metrics.gauge(f"{name}.hit_ratio", self.hit_ratio)
+
+    def hit_ratio(self: "ResponseCache") -> float:
+        """Ratio of lookups served from the cache.
+
+        Returns:
+            Float between 0 and 1.
+        """
+        hits = metrics.counters[f"{self.name}.hits"]
+        lookups = hits + metrics.counters[f"{self.name}.misses"]
+
+        return hits / lookups if lookups else 0.0
+
+    async def version(self: "ResponseCache", group: str) -> str:
+        """Get the current version of a group, starting a new one if it has none.
+
+        Args:
+            group: The group.
+
+        Returns:
+            The version.
+        """
+        version_key = f"{self.name}:version:{group}"
+
+        version = await self.backend.get(version_key)
+
+        if version is None:
+            version = secrets.token_hex(8).encode()
+            await self.backend.set(version_key, version, self.ttl)
+
+        return version.decode()
+
+    async def get(
+        self: "ResponseCache", key: str, *, group: str
+    ) -> Tuple[Optional[bytes], str]:
+        """Get a response body.
+
+        Args:
+            key: The cache key.
+            group: The group of the key.
+
+        Examples:
+            >>> import asyncio
+            >>> from teached.cache import MemoryCache, ResponseCache
+            >>> cache = ResponseCache(backend=MemoryCache(), name="test", ttl=60)
+            >>> loop = asyncio.new_event_loop()
+            >>> body, stored_key = loop.run_until_complete(cache.get("a", group="g"))
+            >>> body is None
+            True
+            >>> loop.run_until_complete(cache.invalidate("g"))
+            >>> loop.run_until_complete(cache.set(stored_key, b"stale"))
+            >>> loop.run_until_complete(cache.get("a", group="g"))[0] is None
+            True
+
+        Returns:
+            The body or None, and the key to store the rebuilt body under.
+        """
+        stored_key = f"{self.name}:{key}#{await self.version(group)}"
+
+        body = await self.backend.get(stored_key)
+
+        metrics.incr(f"{self.name}.hits" if body is not None else f"{self.name}.misses")
+
+        return body, stored_key
+
+    async def set(self: "ResponseCache", stored_key: str, body: bytes) -> None:
+        """Store a response body.
+
+        Args:
+            stored_key: The key returned by get.
+            body: The response body.
+        """
+        await self.backend.set(stored_key, body, self.ttl)
+
+    async def invalidate(self: "ResponseCache", *groups: str) -> None:
+        """Drop the response bodies of groups.
+
+        Args:
+            groups: The groups.
+        """
+        for group in groups:
+            await self.backend.set(
+                f"{self.name}:version:{group}", secrets.token_hex(8).encode(), self.ttl,
+            )
+
+
+def get_cache_backend(*, url: str) -> CacheBackend:
+    """Create cache backend from URL.
+
+    Args:
+        url: memory:// or redis:// URL.
+
+    Examples:
+        >>> from teached.cache import get_cache_backend
+        >>> type(get_cache_backend(url="memory://")).__name__
+        'MemoryCache'
+        >>> type(get_cache_backend(url="redis://localhost:6379/0")).__name__
+        'RedisCache'
+
+    Returns:
+        The backend.
+
+    Raises:
+        ValueError: If the URL scheme is not supported.
+    """
+    scheme = url.split("://", 1)[0]
+
+    if scheme == "memory":
+        return MemoryCache(
+            max_entries=settings.CACHE_MAX_ENTRIES, max_ttl=settings.CACHE_LOCAL_TTL
+        )
+
+    if scheme in ("redis", "rediss"):
+        return RedisCache(url=url)
+
+    raise ValueError(f"Unsupported cache URL {url}")
+
+
+cache_backend = get_cache_backend(url=settings.CACHE_URL)
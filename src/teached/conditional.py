@@ -0,0 +1,130 @@
+"""Conditional GET helpers for Teached Project."""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Optional, Union
+
+from fastapi import Request, Response, status
+
+Body = Union[bytes, memoryview]
+
+
+class BufferResponse(Response):
+    """JSON response whose body may be a memoryview, it is sent without a copy."""
+
+    media_type = "application/json"
+
+    def render(self: "BufferResponse", content: Any) -> Any:
+        """Leave bytes like content as it is.
+
+        Args:
+            content: The body.
+
+        Returns:
+            The body.
+        """
+        if isinstance(content, memoryview):
+            return content
+
+        return super().render(content)
+
+
+def make_etag(*, body: Body) -> str:
+    """Strong ETag of a response body.
+
+    Args:
+        body: The response body.
+
+    Examples:
+        >>> from teached.conditional import make_etag
+        >>> make_etag(body=b"[]")
+        '"7ebb3c7c2a87b1a2f8a7ed729ecb040d"'
+
+    Returns:
+        Quoted entity tag.
+    """
+    digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+
+    return '"' + digest + '"'
+
+
+def http_date(*, value: datetime) -> str:
+    """Format datetime as HTTP date, naive datetime are taken as UTC.
+
+    Args:
+        value: The datetime.
+
+    Examples:
+        >>> from datetime import datetime
+        >>> from teached.conditional import http_date
+        >>> http_date(value=datetime(2020, 6, 20, 10, 30, 15, 999))
+        'Sat, 20 Jun 2020 10:30:15 GMT'
+
+    Returns:
+        The HTTP date.
+    """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def is_not_modified(
+    *, request: Request, etag: str, last_modified: Optional[str] = None
+) -> bool:
+    """Check the request validators against the current representation.
+
+    If-None-Match wins over If-Modified-Since when both are sent.
+
+    Args:
+        request: Request object.
+        etag: The current ETag.
+        last_modified: The current Last-Modified HTTP date.
+
+    Returns:
+        True if the client copy is still fresh.
+    """
+    if_none_match = request.headers.get("if-none-match")
+
+    if if_none_match is not None:
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+
+        except (TypeError, ValueError):
+            return False
+
+        return parsedate_to_datetime(last_modified) <= since
+
+    return False
+
+
+def conditional_response(
+    *, request: Request, body: Body, last_modified: Optional[str] = None
+) -> Response:
+    """Build JSON response that answer 304 when the client copy is fresh.
+
+    Args:
+        request: Request object.
+        body: The JSON body.
+        last_modified: Last-Modified HTTP date, if known.
+
+    Returns:
+        200 JSON response or empty 304 response.
+    """
+    etag = make_etag(body=body)
+
+    headers: Dict[str, str] = {"ETag": etag}
+
+    if last_modified:
+        headers.update({"Last-Modified": last_modified})
+
+    if is_not_modified(request=request, etag=etag, last_modified=last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return BufferResponse(content=body, headers=headers)
@@ -0,0 +1,298 @@
+"""Hourly and daily rollups of course activity for teacher dashboards."""
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Tuple, Type, Union
+
+from tortoise.models import Model
+from tortoise.query_utils import Q
+from tortoise.transactions import in_transaction
+
+from teached.settings import settings
+
+from .enum import StatPeriod  # noqa I202
+from .models import Course, CourseStat, Enrollment, Review, RollupWatermark
+from .utils import as_utc, utc_now
+
+Number = Union[int, float]
+
+Deltas = Dict[Tuple[str, StatPeriod, datetime], Dict[str, Number]]
+
+WATERMARK = "course_stat"
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+STEPS = {StatPeriod.hour: timedelta(hours=1), StatPeriod.day: timedelta(days=1)}
+
+STAT_FIELDS = ("enrollments", "revenue", "reviews", "rating_sum")
+
+
+class WatermarkMoved(Exception):
+    """Another rollup has moved the watermark in the meantime."""
+
+
+def truncate(*, moment: datetime, period: StatPeriod) -> datetime:
+    """Start of the UTC bucket a moment falls in.
+
+    Args:
+        moment: The moment.
+        period: The bucket period.
+
+    Examples:
+        >>> from datetime import datetime
+        >>> from teached.courses.analytics import truncate
+        >>> from teached.courses.enum import StatPeriod
+        >>> truncate(moment=datetime(2020, 6, 20, 10, 30), period=StatPeriod.hour)
+        datetime.datetime(2020, 6, 20, 10, 0, tzinfo=datetime.timezone.utc)
+        >>> truncate(moment=datetime(2020, 6, 20, 10, 30), period=StatPeriod.day)
+        datetime.datetime(2020, 6, 20, 0, 0, tzinfo=datetime.timezone.utc)
+
+    Returns:
+        The aware bucket start.
+    """
+    moment = as_utc(moment=moment)
+
+    if period == StatPeriod.hour:
+        return moment.replace(minute=0, second=0, microsecond=0)
+
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_delta(
+    deltas: Deltas, *, course_id: Any, moment: datetime, **values: Number
+) -> None:
+    """Add values to the hour and the day buckets of a moment.
+
+    Args:
+        deltas: The deltas to update.
+        course_id: The course of the row.
+        moment: When the row was created.
+        values: Stat fields mapped to the values to add.
+
+    Examples:
+        >>> from datetime import datetime
+        >>> from teached.courses.analytics import add_delta
+        >>> deltas = {}
+        >>> add_delta(deltas, course_id=1, moment=datetime(2020, 6, 20, 10), reviews=1)
+        >>> add_delta(deltas, course_id=1, moment=datetime(2020, 6, 20, 11), reviews=1)
+        >>> sorted(delta["reviews"] for delta in deltas.values())
+        [1, 1, 2]
+    """
+    for period in StatPeriod:
+        delta = deltas.setdefault(
+            (f"{course_id}", period, truncate(moment=moment, period=period)), {}
+        )
+
+        for name, value in values.items():
+            delta[name] = delta.get(name, 0) + value
+
+
+async def scan_rows(
+    *, model: Type[Model], start: datetime, end: datetime, fields: Tuple[str, ...]
+) -> AsyncIterator[List[Dict]]:
+    """Iterate the rows created in (start, end] chunk by chunk.
+
+    Args:
+        model: The model, it must have created_at.
+        start: Excluded lower bound.
+        end: Included upper bound.
+        fields: Fields to fetch with id and created_at.
+
+    Yields:
+        Chunks of at most BULK_CHUNK_SIZE rows, oldest first.
+    """
+    after = Q(created_at__gt=start)
+
+    while True:
+        rows = (
+            await model.filter(after, created_at__lte=end)
+            .order_by("created_at", "id")
+            .limit(settings.BULK_CHUNK_SIZE)
+            .values("id", "created_at", *fields)
+        )
+
+        if not rows:
+            return
+
+        yield rows
+
+        last = rows[-1]
+        after = Q(created_at__gt=last["created_at"]) | Q(
+            created_at=last["created_at"], id__gt=last["id"]
+        )
+
+
+async def apply_deltas(deltas: Deltas) -> None:
+    """Add the deltas to the rollup rows, creating the missing ones.
+
+    Args:
+        deltas: Deltas of rollup rows.
+    """
+    existing = {
+        (f"{row.course_id}", row.period, as_utc(moment=row.bucket)): row
+        for row in await CourseStat.filter(
+            course_id__in=list({course_id for course_id, _, _ in deltas}),
+            bucket__gte=min(bucket for _, _, bucket in deltas),
+        )
+    }
+
+    created = []
+
+    for (course_id, period, bucket), delta in deltas.items():
+        row = existing.get((course_id, period, bucket))
+
+        if row is None:
+            created.append(
+                CourseStat(course_id=course_id, period=period, bucket=bucket, **delta)
+            )
+
+            continue
+
+        for name, value in delta.items():
+            setattr(row, name, getattr(row, name) + value)
+
+        await row.save(update_fields=list(delta))
+
+    if created:
+        await CourseStat.bulk_create(created)
+
+
+async def rollup_course_stats() -> int:
+    """Fold the enrollments and reviews created since the watermark.
+
+    Only new rows are read, the rollups and the watermark move together in
+    one transaction. The revenue of an enrollment is the course price after
+    discount when it is folded.
+
+    Returns:
+        Number of folded rows.
+    """
+    end = utc_now() - timedelta(seconds=settings.ANALYTICS_ROLLUP_LAG)
+
+    watermark, _ = await RollupWatermark.get_or_create(
+        name=WATERMARK, defaults={"value": EPOCH}
+    )
+
+    start = as_utc(moment=watermark.value)
+
+    if start >= end:
+        return 0
+
+    deltas: Deltas = {}
+    count = 0
+
+    try:
+        async with in_transaction():
+            async for rows in scan_rows(
+                model=Enrollment, start=start, end=end, fields=("course_id",)
+            ):
+                prices = {
+                    f"{row['id']}": row["price"] * (1 - (row["discount"] or 0))
+                    for row in await Course.filter(
+                        id__in=list({row["course_id"] for row in rows})
+                    ).values("id", "price", "discount")
+                }
+
+                for row in rows:
+                    add_delta(
+                        deltas,
+                        course_id=row["course_id"],
+                        moment=row["created_at"],
+                        enrollments=1,
+                        revenue=prices.get(f"{row['course_id']}", 0),
+                    )
+
+                count += len(rows)
+
+            async for rows in scan_rows(
+                model=Review, start=start, end=end, fields=("course_id", "rate")
+            ):
+                for row in rows:
+                    add_delta(
+                        deltas,
+                        course_id=row["course_id"],
+                        moment=row["created_at"],
+                        reviews=1,
+                        rating_sum=row["rate"],
+                    )
+
+                count += len(rows)
+
+            if deltas:
+                await apply_deltas(deltas)
+
+            # a concurrent rollup has folded the same rows, drop this one
+            if not await RollupWatermark.filter(
+                name=WATERMARK, value=watermark.value
+            ).update(value=end):
+                raise WatermarkMoved()
+
+    except WatermarkMoved:
+        return 0
+
+    return count
+
+
+async def course_stats(*, course: Course, period: StatPeriod, span: int) -> Dict:
+    """Get the last buckets of a course activity.
+
+    At most span rollup rows are read whatever the course history is.
+
+    Args:
+        course: The course.
+        period: The bucket period.
+        span: Number of buckets, the current one included.
+
+    Returns:
+        The buckets, oldest first, and their totals.
+    """
+    step = STEPS[period]
+    first = truncate(moment=utc_now(), period=period) - step * (span - 1)
+
+    rows = {
+        as_utc(moment=row["bucket"]): row
+        for row in await CourseStat.filter(
+            course_id=course.id, period=period, bucket__gte=first
+        )
+        .order_by("bucket")
+        .limit(span)
+        .values("bucket", *STAT_FIELDS)
+    }
+
+    watermark = await RollupWatermark.get_or_none(name=WATERMARK)
+
+    buckets = []
+    totals = dict.fromkeys(STAT_FIELDS, 0)
+
+    for index in range(span):
+        bucket = first + step * index
+        row = rows.get(bucket, {})
+
+        stats = {name: row.get(name, 0) for name in STAT_FIELDS}
+
+        for name in STAT_FIELDS:
+            totals[name] += stats[name]
+
+        buckets.append(
+            {
+                "bucket": bucket,
+                "enrollments": stats["enrollments"],
+                "revenue": stats["revenue"],
+                "reviews": stats["reviews"],
+                "rate": stats["rating_sum"] / stats["reviews"]
+                if stats["reviews"]
+                else 0,
+            }
+        )
+
+    return {
+        "period": period,
+        "updated_until": as_utc(moment=watermark.value) if watermark else None,
+        "buckets": buckets,
+        "totals": {
+            "enrollments": totals["enrollments"],
+            "revenue": totals["revenue"],
+            "reviews": totals["reviews"],
+            "rate": totals["rating_sum"] / totals["reviews"]
+            if totals["reviews"]
+            else 0,
+        },
+    }
@@ -0,0 +1,235 @@
+"""Response caches for courses app."""
+import json
+from typing import Any, Awaitable, Callable, NamedTuple, Optional
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from tortoise.exceptions import DoesNotExist
+
+from teached.cache import ResponseCache, cache_backend
+from teached.conditional import conditional_response
+from teached.settings import settings
+from teached.shortcuts import json_bytes
+
+from .models import Course  # noqa I202
+
+LIST_PREFIX = "list:"
+
+# Every listing is invalidated at once.
+LIST_GROUP = "list"
+
+course_cache = ResponseCache(
+    backend=cache_backend, name="courses", ttl=settings.CACHE_TTL
+)
+
+
+def list_key(**params: Optional[str]) -> str:
+    """Cache key of a course listing.
+
+    Args:
+        params: The listing query parameters.
+
+    Examples:
+        >>> from teached.courses.cache import list_key
+        >>> list_key(level="beginner", search=None, category="Design")
+        'list:category=Design&level=beginner'
+        >>> list_key(category="Design", level="beginner", search="")
+        'list:category=Design&level=beginner'
+
+    Returns:
+        The key, the same for any order of the parameters.
+    """
+    return LIST_PREFIX + urlencode(
+        sorted((name, value) for name, value in params.items() if value)
+    )
+
+
+def detail_key(*, slug: str) -> str:
+    """Cache key of a course detail.
+
+    Args:
+        slug: The slug of course.
+
+    Returns:
+        The key.
+    """
+    return f"detail:{slug}"
+
+
+def document_key(*, slug: str) -> str:
+    """Cache key of the user independent part of a course detail.
+
+    Args:
+        slug: The slug of course.
+
+    Returns:
+        The key.
+    """
+    return f"document:{slug}"
+
+
+def curriculum_key(*, slug: str) -> str:
+    """Cache key of a course curriculum.
+
+    Args:
+        slug: The slug of course.
+
+    Returns:
+        The key.
+    """
+    return f"curriculum:{slug}"
+
+
+def course_group(*, slug: str) -> str:
+    """Cache group of the detail, document and curriculum of a course.
+
+    Args:
+        slug: The slug of course.
+
+    Returns:
+        The group.
+    """
+    return f"course:{slug}"
+
+
+def ref_key(*, slug: str) -> str:
+    """Cache key of a course reference.
+
+    Args:
+        slug: The slug of course.
+
+    Returns:
+        The key.
+    """
+    return f"ref:{slug}"
+
+
+class CourseRef(NamedTuple):
+    """The course fields routes check before going to the related rows."""
+
+    id: str
+
+    teacher_id: str
+
+    title: str
+
+    is_drift: bool
+
+    is_active: bool
+
+    price: float
+
+    def __str__(self: "CourseRef") -> str:
+        """The string representative for course class."""
+        return f"{self.title}"
+
+
+async def get_course_ref(*, slug: str) -> CourseRef:
+    """Resolve a course slug, from the cache when every worker shares it.
+
+    The reference decides ownership, publication and price, so it is only
+    cached when an invalidation reaches every worker. A per worker cache
+    could keep serving the old values after a settings change elsewhere.
+
+    Args:
+        slug: The slug of course.
+
+    Returns:
+        The course reference.
+
+    Raises:
+        DoesNotExist: If there is no course with this slug.
+    """
+    shared = course_cache.backend.shared
+
+    if shared:
+        key = ref_key(slug=slug)
+        cached, stored_key = await course_cache.get(key, group=key)
+
+        if cached is not None:
+            return CourseRef(*json.loads(cached))
+
+    rows = await Course.filter(slug=slug).limit(1).values_list(*CourseRef._fields)
+
+    if not rows:
+        raise DoesNotExist("Object does not exist")
+
+    ref = CourseRef(*jsonable_encoder(rows[0]))
+
+    if shared:
+        await course_cache.set(stored_key, json_bytes(ref))
+
+    return ref
+
+
+async def get_published_course_ref(*, slug: str) -> CourseRef:
+    """Resolve the slug of a published course.
+
+    Args:
+        slug: The slug of course.
+
+    Returns:
+        The course reference.
+
+    Raises:
+        DoesNotExist: If there is no published course with this slug.
+    """
+    ref = await get_course_ref(slug=slug)
+
+    if ref.is_drift or not ref.is_active:
+        raise DoesNotExist("Object does not exist")
+
+    return ref
+
+
+async def cached_response(
+    *, request: Request, key: str, group: str, build: Callable[[], Awaitable[Any]],
+) -> Response:
+    """Serve a conditional JSON response from the cache, building it on miss.
+
+    Only an ETag is sent. The responses also depend on counters and related
+    rows that don't touch the course updated_at, so a Last-Modified date
+    could answer 304 for a changed representation.
+
+    Args:
+        request: Request object.
+        key: The cache key.
+        group: The cache group of the key.
+        build: Coroutine function that return the response data.
+
+    Returns:
+        JSON response or 304 response.
+    """
+    body, stored_key = await course_cache.get(key, group=group)
+
+    if body is None:
+        body = json_bytes(jsonable_encoder(await build()))
+        await course_cache.set(stored_key, body)
+
+    return conditional_response(request=request, body=body)
+
+
+async def invalidate_course_ref(*, slug: str) -> None:
+    """Drop the cached reference of a course after its settings change.
+
+    Args:
+        slug: The slug of course.
+    """
+    await course_cache.invalidate(ref_key(slug=slug))
+
+
+async def invalidate_course(
+    *, slug: Optional[str] = None, listing: bool = False
+) -> None:
+    """Drop the cached responses of a course.
+
+    Args:
+        slug: The slug of the changed course.
+        listing: Whether the listings could have changed too.
+    """
+    if slug:
+        await course_cache.invalidate(course_group(slug=slug))
+
+    if listing:
+        await course_cache.invalidate(LIST_GROUP)
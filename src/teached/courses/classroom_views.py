@@ -1,9 +1,21 @@
 """Views for student classroom."""
-from fastapi import APIRouter, Depends
+from typing import Dict, List
 
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from starlette.responses import StreamingResponse
+
+from teached.notifications import notification_hub
+from teached.pagination import set_next_link
 from teached.users import depends, models
 
-from .models import StudentCourseListPydantic  # noqa: I202
+from .events import lecture_events  # noqa: I202
+from .schema import LectureEvents
+from .services import (
+    complete_lecture,
+    get_inbox,
+    get_student_channels,
+    get_student_courses,
+)
 
 router = APIRouter()
 
@@ -11,6 +23,67 @@ router = APIRouter()
 @router.get("/")
 async def my_courses(
     auth_user: models.Student = Depends(depends.is_student),
-) -> StudentCourseListPydantic:
-    """List of enrolled courses for a student."""
-    return await StudentCourseListPydantic.from_queryset(auth_user.enrollments.all())
+) -> List[Dict]:
+    """List of enrolled courses for a student with their progress."""
+    return await get_student_courses(student=auth_user)
+
+
+@router.get("/announcements/")
+async def announcement_list(
+    request: Request,
+    response: Response,
+    cursor: str = None,
+    limit: int = Query(20, ge=1, le=100),
+    auth_user: models.Student = Depends(depends.is_student),
+) -> List[Dict]:
+    """Announcements of enrolled courses, the next page is in the Link header."""
+    announcements, next_cursor = await get_inbox(
+        student=auth_user, limit=limit, cursor=cursor
+    )
+    set_next_link(request=request, response=response, next_cursor=next_cursor)
+    return announcements
+
+
+@router.get("/stream/")
+async def notification_stream(
+    request: Request, auth_user: models.Student = Depends(depends.is_student),
+) -> StreamingResponse:
+    """Server-sent events of the enrolled courses, such as announcements."""
+    channels = await get_student_channels(student=auth_user)
+
+    return StreamingResponse(
+        notification_hub.stream(
+            channels=channels, is_disconnected=request.is_disconnected,
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/{slug}/lecture/{lecture_slug}/complete/")
+async def lecture_complete(
+    slug: str,
+    lecture_slug: str,
+    auth_user: models.Student = Depends(depends.is_student),
+) -> Dict:
+    """Mark a lecture as completed."""
+    return await complete_lecture(
+        slug=slug, lecture_slug=lecture_slug, student=auth_user
+    )
+
+
+@router.post("/events/", status_code=status.HTTP_202_ACCEPTED)
+async def lecture_events_create(
+    data: LectureEvents, auth_user: models.Student = Depends(depends.is_student),
+) -> Dict:
+    """Queue a batch of lecture view events."""
+    events = [{**event.dict(), "student_id": auth_user.id} for event in data.events]
+
+    if not lecture_events.put_many(events):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many events, try again later",
+            headers={"Retry-After": f"{max(1, round(lecture_events.interval))}"},
+        )
+
+    return {"accepted": len(events)}
@@ -0,0 +1,116 @@
+"""Whole curriculum loader for courses app."""
+import json
+from typing import Any, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+
+from teached.shortcuts import json_bytes
+
+from .cache import course_cache, course_group, curriculum_key  # noqa I202
+from .models import Assignment, Course, Lecture, Section
+from .utils import fan_out
+
+SECTION_FIELDS = (
+    "id",
+    "title",
+    "objective",
+    "order",
+    "slug",
+    "created_at",
+    "updated_at",
+)
+
+LECTURE_FIELDS = (
+    "id",
+    "title",
+    "text",
+    "video",
+    "order",
+    "slug",
+    "created_at",
+    "updated_at",
+)
+
+ASSIGNMENT_FIELDS = (
+    "id",
+    "title",
+    "description",
+    "file",
+    "slug",
+    "created_at",
+    "updated_at",
+)
+
+
+def assemble_curriculum(
+    *, sections: List[Dict], lectures: List[Dict], assignments: List[Dict]
+) -> List[Dict]:
+    """Nest lectures and assignments under their sections in one pass.
+
+    Args:
+        sections: Ordered section rows.
+        lectures: Ordered lecture rows with section_id.
+        assignments: Ordered assignment rows with section_id.
+
+    Examples:
+        >>> from teached.courses.curriculum import assemble_curriculum
+        >>> tree = assemble_curriculum(
+        ...     sections=[{"id": 1}, {"id": 2}],
+        ...     lectures=[{"section_id": 2, "title": "L1"}],
+        ...     assignments=[],
+        ... )
+        >>> [(section["id"], section["lectures"]) for section in tree]
+        [(1, []), (2, [{'title': 'L1'}])]
+
+    Returns:
+        List of sections.
+    """
+    tree: Dict[Any, Dict] = {
+        section["id"]: {**section, "lectures": [], "assignments": []}
+        for section in sections
+    }
+
+    for lecture in lectures:
+        tree[lecture.pop("section_id")]["lectures"].append(lecture)
+
+    for assignment in assignments:
+        tree[assignment.pop("section_id")]["assignments"].append(assignment)
+
+    return list(tree.values())
+
+
+async def load_curriculum(*, course: Course) -> List[Dict]:
+    """Load sections, lectures and assignments of a course in three queries.
+
+    The tree is cached until a section, lecture or assignment is created.
+
+    Args:
+        course: Course instance.
+
+    Returns:
+        List of sections ordered by order, with their lectures and assignments.
+    """
+    cached, stored_key = await course_cache.get(
+        curriculum_key(slug=course.slug), group=course_group(slug=course.slug)
+    )
+
+    if cached is not None:
+        return json.loads(cached)
+
+    rows = await fan_out(
+        name="curriculum",
+        sections=Section.filter(course_id=course.id)
+        .order_by("order")
+        .values(*SECTION_FIELDS),
+        lectures=Lecture.filter(section__course_id=course.id)
+        .order_by("order")
+        .values("section_id", *LECTURE_FIELDS),
+        assignments=Assignment.filter(section__course_id=course.id)
+        .order_by("created_at")
+        .values("section_id", *ASSIGNMENT_FIELDS),
+    )
+
+    curriculum = jsonable_encoder(assemble_curriculum(**rows))
+    await course_cache.set(stored_key, json_bytes(curriculum))
+
+    return curriculum
@@ -1,18 +1,50 @@
 """Collection of depends functions."""
-from typing import Tuple
+from typing import Optional, Tuple
 
 from fastapi import Depends, HTTPException, Request, status
+from tortoise.exceptions import DoesNotExist
 
 from teached.users.depends import is_teacher
 from teached.users.models import Teacher
 
-from .models import Course  # noqa: I202
+from .cache import get_course_ref  # noqa: I202
+from .models import Course
+
+
+async def get_owned_course(
+    *, slug: str, teacher: Teacher, is_drift: Optional[bool]
+) -> Course:
+    """Get an active course of the teacher.
+
+    Args:
+        slug: The slug of course.
+        teacher: Teacher instance.
+        is_drift: Whether the course is a draft or published, None for both.
+
+    Returns:
+        Course model
+
+    Raises:
+        DoesNotExist: If there is no such course.
+        HTTPException: If the teacher doesn't own the course.
+    """
+    ref = await get_course_ref(slug=slug)
+
+    if (is_drift is not None and ref.is_drift != is_drift) or not ref.is_active:
+        raise DoesNotExist("Object does not exist")
+
+    if ref.teacher_id != f"{teacher.id}":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="You don't have permission to access.",
+        )
+    return await Course.get(id=ref.id)
 
 
 async def is_owner(
     request: Request, current_user: Teacher = Depends(is_teacher)
 ) -> Tuple[Teacher, Course]:
-    """Check if the user is owner of the course.
+    """Check if the user is owner of the draft course.
 
     Args:
         request: Request object.
@@ -20,17 +52,47 @@ async def is_owner(
 
     Returns:
         teacher and course model
+    """
+    course = await get_owned_course(
+        slug=request.path_params["slug"], teacher=current_user, is_drift=True
+    )
 
-    Raises:
-        HTTPException: If user is not teacher return 400 status.
+    return current_user, course
+
+
+async def is_published_owner(
+    request: Request, current_user: Teacher = Depends(is_teacher)
+) -> Tuple[Teacher, Course]:
+    """Check if the user is owner of the published course.
+
+    Args:
+        request: Request object.
+        current_user: depends function.
+
+    Returns:
+        teacher and course model
     """
-    course = await Course.get(
-        is_drift=True, is_active=True, slug=request.path_params.get("slug")
+    course = await get_owned_course(
+        slug=request.path_params["slug"], teacher=current_user, is_drift=False
+    )
+
+    return current_user, course
+
+
+async def is_course_owner(
+    request: Request, current_user: Teacher = Depends(is_teacher)
+) -> Tuple[Teacher, Course]:
+    """Check if the user is owner of the course, draft or published.
+
+    Args:
+        request: Request object.
+        current_user: depends function.
+
+    Returns:
+        teacher and course model
+    """
+    course = await get_owned_course(
+        slug=request.path_params["slug"], teacher=current_user, is_drift=None
     )
 
-    if await course.teacher != current_user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="You don't have permission to access.",
-        )
     return current_user, course
@@ -42,3 +42,37 @@ class Level(str, Enum):
     Expert = "expert"
 
     All = "all"
+
+
+class LectureEvent(str, Enum):
+    """Lecture view event enum class."""
+
+    opened = "opened"
+
+    heartbeat = "heartbeat"
+
+    paused = "paused"
+
+    completed = "completed"
+
+
+class StatPeriod(str, Enum):
+    """Rollup period enum class."""
+
+    hour = "hour"
+
+    day = "day"
+
+
+class CourseSort(str, Enum):
+    """Course listing order enum class."""
+
+    trending = "trending"
+
+    popular = "popular"
+
+    rating = "rating"
+
+    newest = "newest"
+
+    price = "price"
@@ -0,0 +1,198 @@
+"""Buffered ingestion of lecture view events."""
+import asyncio
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from teached.metrics import metrics
+from teached.settings import logger, settings
+
+from .models import Enrollment, Lecture, LectureView  # noqa I202
+
+
+class EventBuffer:
+    """Bounded per worker buffer of lecture view events.
+
+    Requests only append to the buffer, a background task writes it to the
+    database with one bulk insert per batch. When the buffer is full the
+    whole incoming batch is rejected, so clients can retry it later.
+    """
+
+    def __init__(
+        self: "EventBuffer",
+        *,
+        name: str,
+        maxsize: int,
+        batch_size: int,
+        interval: float,
+    ) -> None:
+        """Set up the buffer.
+
+        Args:
+            name: Prefix of the buffer metrics.
+            maxsize: Maximum number of buffered events.
+            batch_size: Number of events that trigger a flush.
+            interval: Maximum seconds an event waits before a flush.
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.interval = interval
+        self.events: Deque[Dict] = deque()
+        self._ready: Optional[asyncio.Event] = None
+        self._task: Optional["asyncio.Future[None]"] = None
+        self._stopping = False
+
+        metrics.gauge(f"{name}.queue_depth", self.depth)
+        metrics.gauge(f"{name}.queue_fill", self.fill)
+
+    def depth(self: "EventBuffer") -> int:
+        """Number of buffered events.
+
+        Returns:
+            The number of events waiting for a flush.
+        """
+        return len(self.events)
+
+    def fill(self: "EventBuffer") -> float:
+        """How full the buffer is.
+
+        Returns:
+            Ratio between 0 and 1.
+        """
+        return len(self.events) / self.maxsize
+
+    def put_many(self: "EventBuffer", events: List[Dict]) -> bool:
+        """Append a batch of events, all or nothing.
+
+        Args:
+            events: The events, as LectureView fields.
+
+        Examples:
+            >>> from teached.courses.events import EventBuffer
+            >>> buffer = EventBuffer(name="test", maxsize=3, batch_size=2, interval=1)
+            >>> buffer.put_many([{}, {}])
+            True
+            >>> buffer.put_many([{}, {}])
+            False
+            >>> buffer.depth(), buffer.fill()
+            (2, 0.6666666666666666)
+
+        Returns:
+            False if the batch doesn't fit in the buffer.
+        """
+        if len(self.events) + len(events) > self.maxsize:
+            metrics.incr(f"{self.name}.rejected", len(events))
+
+            return False
+
+        self.events.extend(events)
+        metrics.incr(f"{self.name}.accepted", len(events))
+
+        if self._ready is not None and len(self.events) >= self.batch_size:
+            self._ready.set()
+
+        return True
+
+    async def start(self: "EventBuffer") -> None:
+        """Start the flusher task."""
+        self._ready = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.ensure_future(self._run(self._ready))
+
+    async def stop(self: "EventBuffer") -> None:
+        """Flush what is left and stop the flusher task.
+
+        The task is asked to stop instead of being cancelled, so a bulk
+        insert is never interrupted in the middle.
+        """
+        if self._task is not None and self._ready is not None:
+            self._stopping = True
+            self._ready.set()
+
+            await self._task
+
+            self._task = None
+
+    async def _run(self: "EventBuffer", ready: asyncio.Event) -> None:
+        """Flush by size or time until the buffer is stopped.
+
+        Args:
+            ready: Set when a batch is full or the buffer is stopping.
+        """
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(ready.wait(), timeout=self.interval)
+
+            except asyncio.TimeoutError:
+                pass
+
+            ready.clear()
+
+            while self.events:
+                await self.flush()
+
+                if len(self.events) < self.batch_size and not self._stopping:
+                    break
+
+    async def flush(self: "EventBuffer") -> None:
+        """Write one batch of events to the database.
+
+        The events of unknown lectures, or of a course the student is not
+        enrolled in, are dropped. A failed batch is logged and dropped so it
+        can't block the buffer.
+        """
+        batch = [
+            self.events.popleft() for _ in range(min(self.batch_size, len(self.events)))
+        ]
+
+        with metrics.timer(f"{self.name}.flush"):
+            try:
+                courses = {
+                    f"{row['id']}": f"{row['course_id']}"
+                    for row in await Lecture.filter(
+                        id__in=list({event["lecture_id"] for event in batch})
+                    ).values("id", course_id="section__course_id")
+                }
+
+                enrolled: Set[Tuple[str, str]] = set()
+
+                if courses:
+                    enrolled = {
+                        (f"{student_id}", f"{course_id}")
+                        for student_id, course_id in await Enrollment.filter(
+                            student_id__in=list(
+                                {event["student_id"] for event in batch}
+                            ),
+                            course_id__in=list(set(courses.values())),
+                        ).values_list("student_id", "course_id")
+                    }
+
+                rows = [
+                    LectureView(**event)
+                    for event in batch
+                    if (
+                        f"{event['student_id']}",
+                        courses.get(f"{event['lecture_id']}"),
+                    )
+                    in enrolled
+                ]
+
+                if rows:
+                    await LectureView.bulk_create(rows)
+
+            except Exception as error:
+                metrics.incr(f"{self.name}.dropped", len(batch))
+                logger.error(f"{len(batch)} events have been dropped: {error}")
+
+                return
+
+        metrics.incr(f"{self.name}.flushed", len(rows))
+        metrics.incr(f"{self.name}.dropped", len(batch) - len(rows))
+
+
+lecture_events = EventBuffer(
+    name="events",
+    maxsize=settings.EVENTS_QUEUE_SIZE,
+    batch_size=settings.EVENTS_BATCH_SIZE,
+    interval=settings.EVENTS_FLUSH_INTERVAL,
+)
@@ -0,0 +1,67 @@
+"""In-process name to id tables for the small lookup models."""
+from typing import Dict, Generic, Iterable, Optional, Type, TypeVar
+
+from .models import Category, Language
+
+LookupModel = TypeVar("LookupModel", Category, Language)
+
+
+class NameTable(Generic[LookupModel]):
+    """Process-wide map of names to Category or Language rows.
+
+    The rows are never deleted or renamed by the app, so the map only grows:
+    it is loaded at startup and extended with every inserted row. A name
+    missing from the map is not an error, callers fall back to the database
+    since another worker may have inserted it.
+    """
+
+    def __init__(self: "NameTable[LookupModel]", *, model: Type[LookupModel]) -> None:
+        """Set up empty table.
+
+        Args:
+            model: Category or Language.
+        """
+        self.model: Type[LookupModel] = model
+        self.rows: Dict[str, LookupModel] = {}
+
+    async def load(self: "NameTable[LookupModel]") -> None:
+        """Load every row of the model."""
+        self.rows = {row.name: row for row in await self.model.all()}
+
+    def get(self: "NameTable[LookupModel]", name: str) -> Optional[LookupModel]:
+        """Get row of a name.
+
+        Args:
+            name: The row name.
+
+        Examples:
+            >>> from teached.courses.lookups import NameTable
+            >>> from teached.courses.models import Category
+            >>> table = NameTable(model=Category)
+            >>> table.update([Category(id=1, name="Development")])
+            >>> table.get("Development").id, table.get("Design")
+            (1, None)
+
+        Returns:
+            The row or None if the name is unknown to this worker.
+        """
+        return self.rows.get(name)
+
+    def update(self: "NameTable[LookupModel]", rows: Iterable[LookupModel]) -> None:
+        """Add saved rows to the table.
+
+        Args:
+            rows: Saved model instances.
+        """
+        self.rows.update({row.name: row for row in rows})
+
+
+category_table = NameTable(model=Category)
+
+language_table = NameTable(model=Language)
+
+
+async def load_lookup_tables() -> None:
+    """Load the category and language tables."""
+    await category_table.load()
+    await language_table.load()
@@ -1,10 +1,12 @@
 """Models for courses app."""
+from typing import Dict
+
 from tortoise import Tortoise, fields, models
 from tortoise.contrib.pydantic import pydantic_model_creator
 
 from teached.shortcuts import get_model
 
-from .enum import Level  # noqa I202
+from .enum import LectureEvent, Level, StatPeriod  # noqa I202
 
 Teacher = get_model(path="teached.users.models.Teacher")
 Student = get_model(path="teached.users.models.Student")
@@ -66,7 +68,7 @@ class Course(models.Model):
         null=True,
     )
 
-    price = fields.FloatField(default=0)
+    price = fields.FloatField(default=0, index=True)
 
     discount = fields.FloatField(default=0)
 
@@ -76,7 +78,34 @@ class Course(models.Model):
 
     slug = fields.CharField(unique=True, max_length=200)
 
-    created_at = fields.DatetimeField(auto_now_add=True)
+    # Denormalized aggregates, kept in step with enrollments and reviews.
+    enrollment_count = fields.IntField(default=0, index=True)
+
+    # Enrollments decayed by their age, see the decay-trending command.
+    trending_score = fields.FloatField(default=0, index=True)
+
+    # Lectures ever created, the next lecture takes it as its ordinal.
+    lecture_count = fields.IntField(default=0)
+
+    review_count = fields.IntField(default=0)
+
+    rating_sum = fields.IntField(default=0)
+
+    # One counter per star, from 1 to 5.
+    rating_1 = fields.IntField(default=0)
+
+    rating_2 = fields.IntField(default=0)
+
+    rating_3 = fields.IntField(default=0)
+
+    rating_4 = fields.IntField(default=0)
+
+    rating_5 = fields.IntField(default=0)
+
+    # Bayesian average with the RatingPrior, used for ranking.
+    weighted_rating = fields.FloatField(default=0, index=True)
+
+    created_at = fields.DatetimeField(auto_now_add=True, index=True)
 
     updated_at = fields.DatetimeField(auto_now=True)
 
@@ -85,11 +114,63 @@ class Course(models.Model):
 
         table = "course"
 
+        indexes = (("slug", "is_drift", "is_active"),)
+
+    @property
+    def rate(self: "Course") -> float:
+        """The average rating of the course.
+
+        Examples:
+            >>> from teached.courses.models import Course
+            >>> Course(review_count=2, rating_sum=9).rate
+            4.5
+            >>> Course().rate
+            0
+
+        Returns:
+            The average or 0 if there is no review.
+        """
+        return self.rating_sum / self.review_count if self.review_count else 0
+
+    def rating_histogram(self: "Course") -> Dict[str, int]:
+        """Number of reviews for each star.
+
+        Examples:
+            >>> from teached.courses.models import Course
+            >>> Course(rating_4=2, rating_5=1).rating_histogram()
+            {'1': 0, '2': 0, '3': 0, '4': 2, '5': 1}
+
+        Returns:
+            Dict of star to number of reviews.
+        """
+        return {f"{star}": getattr(self, f"rating_{star}") for star in range(1, 6)}
+
     def __str__(self: "Course") -> str:
         """The string representative for course class."""
         return f"{self.title}"
 
 
+class RatingPrior(models.Model):
+    """The catalog wide prior used to weight course ratings."""
+
+    id = fields.IntField(pk=True)
+
+    mean = fields.FloatField(default=0.0)
+
+    weight = fields.FloatField(default=0.0)
+
+    updated_at = fields.DatetimeField(auto_now=True)
+
+    class Meta:
+        """Meta data."""
+
+        table = "rating_prior"
+
+    def __str__(self: "RatingPrior") -> str:
+        """The string representative for rating prior class."""
+        return f"{self.mean} weighted by {self.weight}"
+
+
 class Requirement(models.Model):
     """The requirement model."""
 
@@ -165,6 +246,9 @@ class Lecture(models.Model):
 
     order = models.IntField()
 
+    # Position of the lecture bit in the enrollment progress of its course.
+    ordinal = fields.IntField(null=True)
+
     slug = fields.CharField(unique=True, max_length=200, null=True)
 
     created_at = fields.DatetimeField(auto_now_add=True)
@@ -210,6 +294,10 @@ class Review(models.Model):
 
         table = "review"
 
+        unique_together = (("course", "student"),)
+
+        indexes = (("course_id", "created_at"),)
+
     def __str__(self: "Review") -> str:
         """The string representative for course class."""
         return f"{self.course} by {self.student}"
@@ -239,6 +327,10 @@ class BookMark(models.Model):
 
         table = "bookmark"
 
+        unique_together = (("course", "student"),)
+
+        indexes = (("student_id", "created_at"),)
+
     def __str__(self: "BookMark") -> str:
         """The string representative for course class."""
         return f"book marked {self.course} for {self.student}"
@@ -261,6 +353,9 @@ class Enrollment(models.Model):
         on_delete=fields.CASCADE,
     )
 
+    # Hex of the bitmap of completed lectures, bit n is the lecture ordinal n.
+    progress = fields.TextField(default="")
+
     created_at = fields.DatetimeField(auto_now_add=True)
 
     updated_at = fields.DatetimeField(auto_now=True)
@@ -270,6 +365,8 @@ class Enrollment(models.Model):
 
         table = "enrollment"
 
+        unique_together = (("course", "student"),)
+
     def __str__(self: "Enrollment") -> str:
         """The string representative for course class."""
         return f"{self.student} enrollment for {self.course}"
@@ -336,6 +433,35 @@ class Announcement(models.Model):
         return f"{self.title}"
 
 
+class InboxItem(models.Model):
+    """The announcement delivered to an enrolled student."""
+
+    id = fields.UUIDField(pk=True)
+
+    student = fields.ForeignKeyField(
+        model_name="models.Student", related_name="inbox", on_delete=fields.CASCADE,
+    )
+
+    announcement = fields.ForeignKeyField(
+        model_name="models.Announcement",
+        related_name="deliveries",
+        on_delete=fields.CASCADE,
+    )
+
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        """Meta data."""
+
+        table = "inbox_item"
+
+        indexes = (("student_id", "created_at"),)
+
+    def __str__(self: "InboxItem") -> str:
+        """The string representative for inbox item class."""
+        return f"{self.announcement} for {self.student}"
+
+
 class Assignment(models.Model):
     """The assignment model."""
 
@@ -369,6 +495,129 @@ class Assignment(models.Model):
         return f"{self.title}"
 
 
+class LectureView(models.Model):
+    """The lecture view event model."""
+
+    id = fields.UUIDField(pk=True)
+
+    lecture = fields.ForeignKeyField(
+        model_name="models.Lecture", related_name="views", on_delete=fields.CASCADE,
+    )
+
+    student = fields.ForeignKeyField(
+        model_name="models.Student",
+        related_name="lecture_views",
+        on_delete=fields.CASCADE,
+    )
+
+    event = fields.CharEnumField(enum_type=LectureEvent, max_length=100)
+
+    # Playback position in seconds when the event happened.
+    position = fields.IntField(default=0)
+
+    # Seconds watched since the previous event of the same player.
+    seconds_watched = fields.IntField(default=0)
+
+    occurred_at = fields.DatetimeField()
+
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        """Meta data."""
+
+        table = "lecture_view"
+
+        indexes = (("student_id", "lecture_id", "occurred_at"),)
+
+    def __str__(self: "LectureView") -> str:
+        """The string representative for lecture view class."""
+        return f"{self.event} of {self.lecture} by {self.student}"
+
+
+class CourseStat(models.Model):
+    """The rollup of a course activity over an hour or a day."""
+
+    id = fields.IntField(pk=True)
+
+    course = fields.ForeignKeyField(
+        model_name="models.Course", related_name="stats", on_delete=fields.CASCADE,
+    )
+
+    period = fields.CharEnumField(enum_type=StatPeriod, max_length=10)
+
+    # Start of the hour or the day, in UTC.
+    bucket = fields.DatetimeField()
+
+    enrollments = fields.IntField(default=0)
+
+    revenue = fields.FloatField(default=0)
+
+    reviews = fields.IntField(default=0)
+
+    rating_sum = fields.IntField(default=0)
+
+    class Meta:
+        """Meta data."""
+
+        table = "course_stat"
+
+        unique_together = (("course", "period", "bucket"),)
+
+    def __str__(self: "CourseStat") -> str:
+        """The string representative for course stat class."""
+        return f"{self.course} {self.period} of {self.bucket}"
+
+
+class CourseNeighbour(models.Model):
+    """The course often taken by the students of another course."""
+
+    id = fields.IntField(pk=True)
+
+    course = fields.ForeignKeyField(
+        model_name="models.Course", related_name="neighbours", on_delete=fields.CASCADE,
+    )
+
+    neighbour = fields.ForeignKeyField(
+        model_name="models.Course",
+        related_name="neighbour_of",
+        on_delete=fields.CASCADE,
+    )
+
+    # Students enrolled to both courses.
+    shared = fields.IntField()
+
+    # Cosine similarity of the two courses enrollments.
+    score = fields.FloatField()
+
+    class Meta:
+        """Meta data."""
+
+        table = "course_neighbour"
+
+        unique_together = (("course", "neighbour"),)
+
+    def __str__(self: "CourseNeighbour") -> str:
+        """The string representative for course neighbour class."""
+        return f"{self.neighbour} for {self.course}"
+
+
+class RollupWatermark(models.Model):
+    """The time up to which rows have been folded into the rollups."""
+
+    name = fields.CharField(pk=True, max_length=100)
+
+    value = fields.DatetimeField()
+
+    class Meta:
+        """Meta data."""
+
+        table = "rollup_watermark"
+
+    def __str__(self: "RollupWatermark") -> str:
+        """The string representative for rollup watermark class."""
+        return f"{self.name} at {self.value}"
+
+
 Tortoise.init_models(["teached.courses.models"], "models")
 CourseListPydantic = pydantic_model_creator(
     Course,
@@ -379,6 +628,16 @@ CourseListPydantic = pydantic_model_creator(
         "video",
         "is_drift",
         "is_active",
+        "enrollment_count",
+        "trending_score",
+        "lecture_count",
+        "review_count",
+        "rating_sum",
+        "rating_1",
+        "rating_2",
+        "rating_3",
+        "rating_4",
+        "rating_5",
         "enrollments",
         "requirements",
         "reviews",
@@ -389,6 +648,9 @@ CourseListPydantic = pydantic_model_creator(
         "teacher.id",
         "announcements",
         "sections",
+        "stats",
+        "neighbours",
+        "neighbour_of",
         "book_marks",
         "teacher.announcements",
         "teacher.user.id",
@@ -403,61 +665,5 @@ CourseListPydantic = pydantic_model_creator(
         "teacher.user.bio",
         "teacher.user.students",
     ),
-)
-
-CourseDetailPydantic = pydantic_model_creator(
-    Course,
-    name="CourseDetail",
-    exclude=(
-        "id",
-        "slug",
-        "is_drift",
-        "is_active",
-        "announcements",
-        "enrollments",
-        "reviews",
-        "teacher.id",
-        "teacher.announcements",
-        "teacher.user.id",
-        "teacher.user.email",
-        "teacher.user.password",
-        "teacher.user.is_superuser",
-        "teacher.user.is_active",
-        "teacher.user.last_login",
-        "teacher.user.joined_at",
-        "teacher.user.full_name",
-        "teacher.user.phone_number",
-        "teacher.user.bio",
-        "teacher.user.students",
-    ),
-)
-
-StudentCourseListPydantic = pydantic_model_creator(
-    Enrollment,
-    name="StudentCourseList",
-    exclude=(
-        "id",
-        "course.id",
-        "course.overview",
-        "course.video",
-        "course.categories",
-        "course.languages",
-        "course.teacher",
-        "course.announcements",
-        "course.price",
-        "course.discount",
-        "course.is_drift",
-        "course.is_active",
-        "course.book_marks",
-        "course.teacher_id",
-        "course.requirements",
-        "course.reviews",
-        "course.sections",
-        "course.created_at",
-        "course.updated_at",
-        "student",
-        "student_id",
-        "created_at",
-        "updated_at",
-    ),
+    computed=("rating_histogram",),
 )
@@ -0,0 +1,265 @@
+"""Students who took this course also took, from co-enrollments."""
+import heapq
+import math
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import DefaultDict, Dict, Iterable, List, Optional, Set, Tuple
+
+from tortoise.transactions import in_transaction
+
+from teached.settings import settings
+
+from .analytics import EPOCH, WatermarkMoved, scan_rows  # noqa I202
+from .models import Course, CourseNeighbour, Enrollment, RollupWatermark
+from .services import chunked
+from .utils import as_utc, utc_now
+
+WATERMARK = "course_neighbour"
+
+Neighbours = Dict[str, List[Tuple[str, int, float]]]
+
+
+def top_neighbours(
+    *,
+    baskets: Iterable[List[str]],
+    sizes: Dict[str, int],
+    count: int,
+    courses: Optional[Set[str]] = None,
+) -> Neighbours:
+    """Rank the neighbours of courses by cosine similarity.
+
+    The baskets are the rows of the sparse student by course matrix, the
+    co-enrollments are its Gram matrix, accumulated one row at a time.
+
+    Args:
+        baskets: The courses of every student.
+        sizes: Enrollments of every course that can be recommended.
+        count: Neighbours kept for every course.
+        courses: Courses to rank, all of them if None.
+
+    Examples:
+        >>> from teached.courses.recommendations import top_neighbours
+        >>> baskets = [["a", "b"], ["a", "b", "c"], ["a", "c"], ["b"]]
+        >>> top_neighbours(baskets=baskets, sizes={"a": 4, "b": 4, "c": 1}, count=1)
+        {'a': [('c', 2, 1.0)], 'b': [('a', 2, 0.5)], 'c': [('a', 2, 1.0)]}
+
+    Returns:
+        Dict of course to its neighbours, shared students and score.
+    """
+    shared: DefaultDict[str, Counter] = defaultdict(Counter)
+
+    for basket in baskets:
+        for course in basket:
+            if course in sizes and (courses is None or course in courses):
+                shared[course].update(basket)
+
+    neighbours = {}
+
+    for course, row in shared.items():
+        norm = math.sqrt(sizes[course] or 1)
+
+        best = heapq.nlargest(
+            count,
+            (
+                (other, together, together / (norm * math.sqrt(sizes[other] or 1)))
+                for other, together in row.items()
+                if other != course and other in sizes
+            ),
+            key=lambda item: (item[2], item[1]),
+        )
+
+        if best:
+            neighbours[course] = best
+
+    return neighbours
+
+
+async def load_baskets(
+    *, end: datetime, students: Optional[Set[str]] = None
+) -> List[List[str]]:
+    """Load the courses of students, leaving out the too large baskets.
+
+    Args:
+        end: Ignore enrollments created after it.
+        students: The students, all of them if None.
+
+    Returns:
+        The baskets.
+    """
+    baskets: DefaultDict[str, List[str]] = defaultdict(list)
+
+    if students is None:
+        async for rows in scan_rows(
+            model=Enrollment, start=EPOCH, end=end, fields=("student_id", "course_id")
+        ):
+            for row in rows:
+                baskets[f"{row['student_id']}"].append(f"{row['course_id']}")
+
+    else:
+        for chunk in chunked(list(students)):
+            for student_id, course_id in await Enrollment.filter(
+                student_id__in=chunk, created_at__lte=end
+            ).values_list("student_id", "course_id"):
+                baskets[f"{student_id}"].append(f"{course_id}")
+
+    return [
+        basket
+        for basket in baskets.values()
+        if len(basket) <= settings.RECOMMENDATION_MAX_BASKET
+    ]
+
+
+async def affected_courses(*, start: datetime, end: datetime) -> Set[str]:
+    """Courses whose co-enrollments changed with the new enrollments.
+
+    Args:
+        start: Excluded lower bound of the new enrollments.
+        end: Included upper bound of the new enrollments.
+
+    Returns:
+        Every course of the newly enrolled students.
+    """
+    students: Set[str] = set()
+
+    async for rows in scan_rows(
+        model=Enrollment, start=start, end=end, fields=("student_id",)
+    ):
+        students.update(f"{row['student_id']}" for row in rows)
+
+    return {
+        course
+        for basket in await load_baskets(end=end, students=students)
+        for course in basket
+    }
+
+
+async def course_students(*, courses: Set[str], end: datetime) -> Optional[Set[str]]:
+    """Students of courses, as long as they are few enough to load by id.
+
+    Args:
+        courses: The courses.
+        end: Ignore enrollments created after it.
+
+    Returns:
+        The students, None if there are more than
+        RECOMMENDATION_MAX_INCREMENTAL_STUDENTS of them.
+    """
+    students: Set[str] = set()
+
+    for chunk in chunked(list(courses)):
+        students.update(
+            f"{student_id}"
+            for student_id in await Enrollment.filter(
+                course_id__in=chunk, created_at__lte=end
+            ).values_list("student_id", flat=True)
+        )
+
+        if len(students) > settings.RECOMMENDATION_MAX_INCREMENTAL_STUDENTS:
+            return None
+
+    return students
+
+
+async def store_neighbours(
+    *, neighbours: Neighbours, courses: Optional[Set[str]]
+) -> None:
+    """Replace the stored neighbours of courses.
+
+    Args:
+        neighbours: The new neighbours.
+        courses: Courses to replace, all of them if None.
+    """
+    if courses is None:
+        await CourseNeighbour.all().delete()
+
+    else:
+        for chunk in chunked(list(courses)):
+            await CourseNeighbour.filter(course_id__in=chunk).delete()
+
+    rows = [
+        CourseNeighbour(
+            course_id=course, neighbour_id=other, shared=shared, score=score
+        )
+        for course, ranked in neighbours.items()
+        for other, shared, score in ranked
+    ]
+
+    for chunk in chunked(rows):
+        await CourseNeighbour.bulk_create(chunk)
+
+
+async def recompute_recommendations(*, full: bool) -> int:
+    """Recompute the neighbours of courses.
+
+    The full mode ranks every course again. The incremental mode only
+    ranks the courses of the students enrolled since the last run, the
+    others keep the scores of the last full run.
+
+    The scores of a course depend on the baskets of all its students, so
+    the incremental mode reloads every student of the affected courses, and
+    one enrollment to a popular course reloads most of them. Past
+    RECOMMENDATION_MAX_INCREMENTAL_STUDENTS students the run is a full one,
+    a single scan is cheaper than loading them by id.
+
+    Args:
+        full: Whether to rank every course.
+
+    Returns:
+        Number of courses with neighbours, 0 if there was nothing new.
+    """
+    end = utc_now() - timedelta(seconds=settings.ANALYTICS_ROLLUP_LAG)
+
+    watermark, _ = await RollupWatermark.get_or_create(
+        name=WATERMARK, defaults={"value": EPOCH}
+    )
+
+    if not full and as_utc(moment=watermark.value) >= end:
+        return 0
+
+    try:
+        async with in_transaction():
+            sizes = {
+                f"{course_id}": enrollments
+                for course_id, enrollments in await Course.filter(
+                    is_drift=False, is_active=True
+                ).values_list("id", "enrollment_count")
+            }
+
+            courses = (
+                None
+                if full
+                else await affected_courses(
+                    start=as_utc(moment=watermark.value), end=end
+                )
+            )
+
+            students = (
+                None
+                if courses is None
+                else await course_students(courses=courses, end=end)
+            )
+
+            if students is None:
+                courses = None
+
+            baskets = await load_baskets(end=end, students=students)
+
+            neighbours = top_neighbours(
+                baskets=baskets,
+                sizes=sizes,
+                count=settings.RECOMMENDATION_COUNT,
+                courses=courses,
+            )
+
+            await store_neighbours(neighbours=neighbours, courses=courses)
+
+            # a concurrent run has moved the watermark, keep its neighbours
+            if not await RollupWatermark.filter(
+                name=WATERMARK, value=watermark.value
+            ).update(value=end):
+                raise WatermarkMoved()
+
+    except WatermarkMoved:
+        return 0
+
+    return len(neighbours)
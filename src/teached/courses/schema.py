@@ -1,10 +1,11 @@
 """Collection of pydantic schema."""
 from datetime import datetime
 from typing import Dict, List, Optional
+from uuid import UUID
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, validator
 
-from .enum import Level
+from .enum import LectureEvent, Level
 
 
 class Course(BaseModel):
@@ -50,6 +51,10 @@ class CourseDetail(BaseModel):
 
     rate: int
 
+    rating_histogram: Dict[str, int]
+
+    weighted_rating: float
+
     created_at: datetime
 
     updated_at: datetime
@@ -70,6 +75,8 @@ class CourseDetail(BaseModel):
 
     sections: List[Dict]
 
+    recommendations: List[Dict] = []
+
 
 class CreateReview(BaseModel):
     """Schema for review creation data."""
@@ -107,6 +114,62 @@ class CreateAssignment(BaseModel):
     description: str
 
 
+class CurriculumSection(CreateSection):
+    """Schema for a section of a curriculum tree."""
+
+    lectures: List[CreateLecture] = []
+
+    assignments: List[CreateAssignment] = []
+
+    @validator("lectures")
+    def lectures_order(cls: "CurriculumSection", value: List) -> List:  # noqa DAR101
+        """Make sure lectures of the section have distinct order.
+
+        Args:
+            value: The lectures from an input.
+
+        Returns:
+            The lectures if they are valid.
+
+        Raises:
+            ValueError: If two lectures have the same order.
+        """
+        if len({lecture.order for lecture in value}) != len(value):
+            raise ValueError("Lectures must have distinct order")
+
+        return value
+
+
+class CreateCurriculum(BaseModel):
+    """Schema for bulk curriculum creation data."""
+
+    sections: List[CurriculumSection] = Field(..., min_items=1)
+
+    @validator("sections")
+    def sections_order(cls: "CreateCurriculum", value: List) -> List:  # noqa DAR101
+        """Make sure sections have distinct order.
+
+        Args:
+            value: The sections from an input.
+
+        Returns:
+            The sections if they are valid.
+
+        Raises:
+            ValueError: If two sections have the same order.
+        """
+        if len({section.order for section in value}) != len(value):
+            raise ValueError("Sections must have distinct order")
+
+        return value
+
+
+class CohortEnrollment(BaseModel):
+    """Schema for cohort enrollment data."""
+
+    students: List[str] = Field(..., min_items=1, max_items=10000)
+
+
 class CreateAnnouncement(BaseModel):
     """Schema for announcement creation data."""
 
@@ -125,3 +188,23 @@ class CourseSettings(BaseModel):
     price: Optional[float]
 
     discount: Optional[float]
+
+
+class LectureEventIn(BaseModel):
+    """Schema for a lecture view event."""
+
+    lecture_id: UUID
+
+    event: LectureEvent
+
+    position: int = Field(0, ge=0)
+
+    seconds_watched: int = Field(0, ge=0)
+
+    occurred_at: datetime
+
+
+class LectureEvents(BaseModel):
+    """Schema for a batch of lecture view events."""
+
+    events: List[LectureEventIn] = Field(..., min_items=1, max_items=1000)
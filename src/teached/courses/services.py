@@ -1,10 +1,23 @@
 """Collection of services."""
-from typing import Any, Dict, List, Optional
+import json
+from itertools import zip_longest
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
 
-from fastapi import HTTPException, status
+from fastapi import BackgroundTasks, HTTPException, status
+from fastapi.encoders import jsonable_encoder
 from tortoise import QuerySet
-
-from teached.users.models import Teacher
+from tortoise.expressions import F
+from tortoise.functions import Count, Sum
+from tortoise.query_utils import Q
+from tortoise.transactions import in_transaction
+
+from teached.metrics import metrics
+from teached.notifications import notification_hub
+from teached.pagination import encode_key_cursor, paginate, seek
+from teached.settings import settings
+from teached.shortcuts import insert_many_or_ignore, insert_or_ignore, json_bytes
+from teached.users.models import Student, Teacher, User
 
 from .models import (  # noqa I202
     Announcement,
@@ -12,16 +25,83 @@ from .models import (  # noqa I202
     BookMark,
     Category,
     Course,
-    CourseDetailPydantic,
+    CourseNeighbour,
     Enrollment,
+    InboxItem,
     Language,
     Lecture,
+    RatingPrior,
     Requirement,
     Review,
+    RollupWatermark,
     Section,
 )
+from .cache import (
+    course_cache,
+    course_group,
+    document_key,
+    get_published_course_ref,
+    invalidate_course,
+    invalidate_course_ref,
+)
+from .curriculum import load_curriculum
+from .enum import CourseSort
+from .lookups import LookupModel, NameTable, category_table, language_table
 from .schema import CourseDetail
-from .utils import unique_slug
+from .utils import as_utc, count_bits, fan_out, set_bit, unique_slug, utc_now
+
+# Sort column and direction of every listing order, each column is indexed.
+COURSE_SORTS = {
+    CourseSort.trending: ("trending_score", True),
+    CourseSort.popular: ("enrollment_count", True),
+    CourseSort.rating: ("weighted_rating", True),
+    CourseSort.newest: ("created_at", True),
+    CourseSort.price: ("price", False),
+}
+
+TRENDING_WATERMARK = "trending_score"
+
+
+async def get_or_create_named(
+    *, table: "NameTable[LookupModel]", names: List[str]
+) -> List[LookupModel]:
+    """Get rows by name, inserting the missing ones in one statement.
+
+    Names known to the lookup table cost no query.
+
+    Args:
+        table: The lookup table of Category or Language.
+        names: The capitalized names.
+
+    Returns:
+        List of model instances.
+    """
+    model = table.model
+
+    rows = []
+    unknown = []
+
+    for name in dict.fromkeys(names):
+        row = table.get(name)
+
+        if row is None:
+            unknown.append(name)
+
+        else:
+            rows.append(row)
+
+    if unknown:
+        found = await model.filter(name__in=unknown)
+
+        missing = set(unknown) - {row.name for row in found}
+
+        if missing:
+            await model.bulk_create([model(name=name) for name in missing])
+            found += await model.filter(name__in=missing)
+
+        rows += found
+
+    return rows
 
 
 async def create_course(*, data: Dict, teacher: Teacher) -> str:
@@ -34,9 +114,9 @@ async def create_course(*, data: Dict, teacher: Teacher) -> str:
     Returns:
         Slug of the course
     """
-    languages = data.pop("languages")
+    languages = [language.capitalize() for language in data.pop("languages")]
 
-    categories = data.pop("categories")
+    categories = [category.capitalize() for category in data.pop("categories")]
 
     requirements = data.pop("requirements")
 
@@ -45,20 +125,30 @@ async def create_course(*, data: Dict, teacher: Teacher) -> str:
     # TODO: change this to signal
     course.slug = unique_slug(title=data.get("title"))
 
-    await course.save()
+    async with in_transaction():
+        await course.save()
 
-    for language in languages:
-        value, created = await Language.get_or_create(name=language.capitalize())
+        language_rows = await get_or_create_named(table=language_table, names=languages)
+        await course.languages.add(*language_rows)
 
-        await course.languages.add(value)
-
-    for category in categories:
-        value, created = await Category.get_or_create(name=category.capitalize())
+        category_rows = await get_or_create_named(
+            table=category_table, names=categories
+        )
+        await course.categories.add(*category_rows)
+
+        if requirements:
+            await Requirement.bulk_create(
+                [
+                    Requirement(name=requirement.capitalize(), course=course)
+                    for requirement in requirements
+                ]
+            )
 
-        await course.categories.add(value)
+    # only once committed, a rolled back insert must not leak its ids
+    language_table.update(language_rows)
+    category_table.update(category_rows)
 
-    for requirement in requirements:
-        await Requirement.create(name=requirement.capitalize(), course=course)
+    await invalidate_course(listing=True)
 
     return course.slug
 
@@ -91,10 +181,22 @@ async def get_published_courses(
         courses = courses.filter(title=search)
 
     if category:
-        courses = courses.filter(categories__name=category)
+        category_row = category_table.get(category)
+
+        courses = (
+            courses.filter(categories__id=category_row.id)
+            if category_row is not None
+            else courses.filter(categories__name=category)
+        )
 
     if language:
-        courses = courses.filter(languages__name=language)
+        language_row = language_table.get(language)
+
+        courses = (
+            courses.filter(languages__id=language_row.id)
+            if language_row is not None
+            else courses.filter(languages__name=language)
+        )
 
     if level:
         courses = courses.filter(level=level)
@@ -108,6 +210,135 @@ async def get_published_courses(
     return courses
 
 
+async def get_sorted_courses(
+    *,
+    sort: CourseSort,
+    limit: int,
+    cursor: Optional[str] = None,
+    **filters: Optional[str],
+) -> Tuple[QuerySet[Course], Optional[str]]:
+    """Return one ordered page of the published courses.
+
+    Every sort has an indexed column, the page is read in index order
+    after the cursor instead of sorting the catalog.
+
+    Args:
+        sort: The order.
+        limit: Page size.
+        cursor: Cursor returned with the previous page.
+        filters: Filters of get_published_courses.
+
+    Returns:
+        Query set of the page and the cursor of the next page.
+    """
+    field, descending = COURSE_SORTS[sort]
+
+    courses = seek(
+        queryset=await get_published_courses(**filters),
+        field=field,
+        descending=descending,
+        cursor=cursor,
+    )
+
+    keys = await courses.limit(limit + 1).values("id", field)
+
+    next_cursor = None
+
+    if len(keys) > limit:
+        keys = keys[:limit]
+        next_cursor = encode_key_cursor(value=keys[-1][field], id=keys[-1]["id"])
+
+    return courses.filter(id__in=[key["id"] for key in keys]), next_cursor
+
+
+async def get_course_document(*, slug: str) -> Dict:
+    """Return the user independent detail of a published course.
+
+    The document is cached until the course changes, it also carries the
+    course id and the teacher user id for the per-user checks.
+
+    Args:
+        slug: The slug of course.
+
+    Returns:
+        Dict of course detail data.
+    """
+    cached, stored_key = await course_cache.get(
+        document_key(slug=slug), group=course_group(slug=slug)
+    )
+
+    if cached is not None:
+        return json.loads(cached)
+
+    with metrics.timer("course_detail.course"):
+        course = await Course.get(is_drift=False, is_active=True, slug=slug)
+
+    fetched = await fan_out(
+        name="course_detail",
+        categories=Category.filter(courses__id=course.id).values("name"),
+        languages=Language.filter(courses__id=course.id).values("name"),
+        requirements=Requirement.filter(course_id=course.id).values(
+            "id", "name", "created_at", "updated_at"
+        ),
+        sections=load_curriculum(course=course),
+        teachers=User.filter(teachers__id=course.teacher_id)
+        .limit(1)
+        .values("id", "username"),
+        recommendations=CourseNeighbour.filter(
+            course_id=course.id, neighbour__is_drift=False, neighbour__is_active=True
+        )
+        .order_by("-score")
+        .limit(settings.RECOMMENDATION_COUNT)
+        .values(
+            title="neighbour__title", cover="neighbour__cover", slug="neighbour__slug"
+        ),
+    )
+
+    teacher = next(iter(fetched.pop("teachers")), None)
+
+    data = {
+        "id": course.id,
+        "title": course.title,
+        "overview": course.overview,
+        "level": course.level,
+        "cover": course.cover,
+        "video": course.video,
+        "price": course.price,
+        "discount": course.discount,
+        "created_at": course.created_at,
+        "updated_at": course.updated_at,
+        "enrollments": course.enrollment_count,
+        "reviews": course.review_count,
+        "rate": course.rate,
+        "rating_histogram": course.rating_histogram(),
+        "weighted_rating": course.weighted_rating,
+        "teacher": {"user": {"username": teacher["username"]}} if teacher else None,
+        "teacher_user_id": teacher["id"] if teacher else None,
+        **fetched,
+    }
+
+    data = jsonable_encoder(data)
+    await course_cache.set(stored_key, json_bytes(data))
+
+    return data
+
+
+async def has_enrolled(*, slug: str, user: Any) -> bool:
+    """Check if a user is enrolled to a course.
+
+    Args:
+        slug: The slug of course.
+        user: Current authenticated user.
+
+    Returns:
+        False for anonymous users.
+    """
+    if not user:
+        return False
+
+    return await Enrollment.exists(course__slug=slug, student__user_id=user.id)
+
+
 async def get_published_course(*, slug: str, user: Any) -> CourseDetail:
     """Return a published courses.
 
@@ -118,48 +349,21 @@ async def get_published_course(*, slug: str, user: Any) -> CourseDetail:
     Returns:
         Query set of course.
     """
-    course = await Course.get(is_drift=False, is_active=True, slug=slug)
-    pydatic_data = await CourseDetailPydantic.from_tortoise_orm(course)
-    data = pydatic_data.dict()
+    fetched = await fan_out(
+        name="course_detail",
+        document=get_course_document(slug=slug),
+        has_enroll=has_enrolled(slug=slug, user=user),
+    )
+
+    data = fetched.pop("document")
     data.update(
         {
             "is_authenticated": user is not None,
-            "has_enroll": False,
-            "is_owner": False,
-            "enrollments": await course.enrollments.all().count(),
-            "reviews": await course.reviews.all().count(),
+            "has_enroll": fetched["has_enroll"],
+            "is_owner": user is not None and data["teacher_user_id"] == f"{user.id}",
         }
     )
 
-    if user:
-        user_student = await user.students.first()
-        user_teacher = await user.teachers.first()
-
-        if user_student:
-            data.update(
-                {
-                    "has_enroll": await course.enrollments.filter(
-                        student=user_student
-                    ).first()
-                    is not None
-                }
-            )
-
-        author = await course.teacher
-
-        if user_teacher == author:
-            data.update({"is_owner": True})
-
-    # TODO: change it to computed method.
-    reviews = course.reviews.all()
-    try:
-        rate = sum(review.rate for review in await reviews) / await reviews.count()
-
-    except ZeroDivisionError:
-        rate = 0
-
-    data.update({"rate": rate})
-
     return CourseDetail(**data)
 
 
@@ -176,13 +380,7 @@ async def enroll_to_published_course(*, slug: str, student: Any) -> Dict[str, st
     Raises:
         HTTPException: If use has already enrolled.
     """
-    course = await Course.get(is_drift=False, is_active=True, slug=slug)
-
-    if await course.enrollments.filter(student=student):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"You already enrolled to {course}",
-        )
+    course = await get_published_course_ref(slug=slug)
 
     if course.price > 0:
         print("Payment")
@@ -192,13 +390,109 @@ async def enroll_to_published_course(*, slug: str, student: Any) -> Dict[str, st
         # TODO: add payment process to the payment model
         # Payment()
 
-    await Enrollment.create(course=course, student=student)
+    async with in_transaction():
+        if not await insert_or_ignore(Enrollment(course_id=course.id, student=student)):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"You already enrolled to {course}",
+            )
+
+        await Course.filter(id=course.id).update(
+            enrollment_count=F("enrollment_count") + 1,
+            trending_score=F("trending_score") + 1,
+        )
+
+    await invalidate_course(slug=slug, listing=True)
 
     return {
         "detail": f"Yea! you have enrolled to {course}, go and enjoy the course now :)"
     }
 
 
+def chunked(items: List, size: int = settings.BULK_CHUNK_SIZE) -> List[List]:
+    """Split items into lists of at most size items.
+
+    Args:
+        items: The items.
+        size: Items per chunk.
+
+    Examples:
+        >>> from teached.courses.services import chunked
+        >>> chunked([1, 2, 3], size=2)
+        [[1, 2], [3]]
+
+    Returns:
+        List of chunks.
+    """
+    return [items[index : index + size] for index in range(0, len(items), size)]
+
+
+async def enroll_cohort(*, course: Course, students: List[str]) -> Dict:
+    """Enroll many students to a published course in one transaction.
+
+    Args:
+        course: Course instance.
+        students: Usernames or user ids of the students.
+
+    Returns:
+        Dict of enrolled and skipped counts and the unknown students.
+    """
+    # user ids are compared in their canonical form, whatever their case
+    normalized: Dict[str, str] = {}
+    user_ids, usernames = [], []
+
+    for student in dict.fromkeys(students):
+        try:
+            normalized[student] = str(UUID(student))
+            user_ids.append(normalized[student])
+
+        except ValueError:
+            normalized[student] = student
+            usernames.append(student)
+
+    rows = []
+
+    for ids_chunk, names_chunk in zip_longest(
+        chunked(user_ids), chunked(usernames), fillvalue=[]
+    ):
+        rows += await Student.filter(
+            Q(user_id__in=ids_chunk) | Q(user__username__in=names_chunk)
+        ).values("id", "user_id", "user__username")
+
+    found = {f"{row['user_id']}" for row in rows} | {
+        row["user__username"] for row in rows
+    }
+
+    # a student named by its id and its username is found twice
+    student_ids = list(dict.fromkeys(row["id"] for row in rows))
+
+    async with in_transaction():
+        # concurrent enrollments are skipped by the unique constraint
+        enrolled = await insert_many_or_ignore(
+            [
+                Enrollment(course_id=course.id, student_id=student_id)
+                for student_id in student_ids
+            ]
+        )
+
+        if enrolled:
+            await Course.filter(id=course.id).update(
+                enrollment_count=F("enrollment_count") + enrolled,
+                trending_score=F("trending_score") + enrolled,
+            )
+
+    if enrolled:
+        await invalidate_course(slug=course.slug, listing=True)
+
+    return {
+        "enrolled": enrolled,
+        "skipped": len(student_ids) - enrolled,
+        "unknown": [
+            student for student in students if normalized[student] not in found
+        ],
+    }
+
+
 async def bookmark_a_published_course(*, slug: str, student: Any) -> Dict[str, str]:
     """Bookmark a published course.
 
@@ -212,35 +506,156 @@ async def bookmark_a_published_course(*, slug: str, student: Any) -> Dict[str, s
     Raises:
         HTTPException: If use has already bookmarked.
     """
-    course = await Course.get(is_drift=False, is_active=True, slug=slug)
+    course = await get_published_course_ref(slug=slug)
 
-    if await course.book_marks.filter(course=course, student=student):
+    if not await insert_or_ignore(BookMark(course_id=course.id, student=student)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"You already bookmark {course}",
         )
 
-    await BookMark.create(course=course, student=student)
-
     return {"detail": f"{course} has been bookmarked :)"}
 
 
-async def get_bookmarks(*, student: Any) -> List[Dict]:
-    """Get list of bookmark.
+async def get_bookmarks(
+    *, student: Any, limit: int, cursor: Optional[str] = None
+) -> Tuple[List[Dict], Optional[str]]:
+    """Get page of bookmarks, latest first.
+
+    Args:
+        student: Student instances.
+        limit: Page size.
+        cursor: Cursor of the page.
+
+    Returns:
+        List of bookmarked course and the cursor of the next page.
+    """
+    return await paginate(
+        queryset=BookMark.filter(student=student),
+        limit=limit,
+        cursor=cursor,
+        title="course__title",
+        cover="course__cover",
+        slug="course__slug",
+    )
+
+
+async def complete_lecture(*, slug: str, lecture_slug: str, student: Any) -> Dict:
+    """Mark a lecture of an enrolled course as completed.
+
+    The progress bitmap is swapped with a conditional single row update,
+    retried up to PROGRESS_UPDATE_RETRIES times if a concurrent completion
+    changed it in between.
 
     Args:
+        slug: The slug of course.
+        lecture_slug: The slug of lecture.
         student: Student instances.
 
     Returns:
-        List of bookmarked course.
+        The course progress.
+
+    Raises:
+        HTTPException: If the student has not enrolled to the course or the
+            progress kept changing.
     """
-    course_list = []
-    for bookmark in await BookMark.filter(student=student):
-        course = await bookmark.course
-        course_list.append(
-            {"title": f"{course.title}", "cover": {course.cover}, "slug": course.slug}
+    course = await get_published_course_ref(slug=slug)
+
+    lecture = await Lecture.get(slug=lecture_slug, section__course_id=course.id)
+
+    ordinal = lecture.ordinal
+
+    if ordinal is None:
+        ordinal = await assign_lecture_ordinal(
+            lecture_id=lecture.id, course_id=course.id
         )
-    return course_list
+
+    for _ in range(settings.PROGRESS_UPDATE_RETRIES + 1):
+        rows = (
+            await Enrollment.filter(course_id=course.id, student=student)
+            .limit(1)
+            .values("id", "progress", lecture_count="course__lecture_count")
+        )
+
+        if not rows:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="You need to enroll to the course first",
+            )
+
+        enrollment = rows[0]
+        progress = set_bit(bitmap=enrollment["progress"], index=ordinal)
+
+        if progress == enrollment["progress"] or await Enrollment.filter(
+            id=enrollment["id"], progress=enrollment["progress"]
+        ).update(progress=progress):
+            break
+
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The progress is being updated, please try again",
+        )
+
+    return lecture_progress(bitmap=progress, total=enrollment["lecture_count"])
+
+
+def lecture_progress(*, bitmap: str, total: int) -> Dict:
+    """Summarize a progress bitmap.
+
+    Args:
+        bitmap: Hex of the completed lectures bitmap.
+        total: Number of lectures of the course.
+
+    Examples:
+        >>> from teached.courses.services import lecture_progress
+        >>> lecture_progress(bitmap="7", total=4)
+        {'completed': 3, 'total': 4, 'percent': 75.0}
+
+    Returns:
+        Completed lectures, total lectures and percent.
+    """
+    completed = count_bits(bitmap=bitmap)
+
+    return {
+        "completed": completed,
+        "total": total,
+        "percent": round(100 * completed / total, 2) if total else 0.0,
+    }
+
+
+async def get_student_courses(*, student: Any) -> List[Dict]:
+    """Get enrolled courses of a student with their progress.
+
+    Args:
+        student: Student instances.
+
+    Returns:
+        List of courses.
+    """
+    rows = await Enrollment.filter(student=student).values(
+        "progress",
+        title="course__title",
+        cover="course__cover",
+        level="course__level",
+        slug="course__slug",
+        lecture_count="course__lecture_count",
+    )
+
+    return [
+        {
+            "course": {
+                "title": row["title"],
+                "cover": row["cover"],
+                "level": row["level"],
+                "slug": row["slug"],
+            },
+            "progress": lecture_progress(
+                bitmap=row["progress"], total=row["lecture_count"]
+            ),
+        }
+        for row in rows
+    ]
 
 
 async def create_review_for_published_course(
@@ -260,48 +675,85 @@ async def create_review_for_published_course(
         HTTPException: If use has has not enroll for the course or
                        student review the course already.
     """
-    course = await Course.get(is_drift=False, is_active=True, slug=slug)
+    course = await get_published_course_ref(slug=slug)
 
-    if not await course.enrollments.filter(student=student):
+    if not await Enrollment.exists(course_id=course.id, student=student):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="You need to enroll to the course first",
         )
 
-    if await course.reviews.filter(student=student):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="You already review this course",
+    rate = data.get("rate")
+    prior = await RatingPrior.first() or RatingPrior()
+
+    async with in_transaction():
+        if not await insert_or_ignore(
+            Review(**data, course_id=course.id, student=student)
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="You already review this course",
+            )
+
+        # The right hand side sees the values from before the update, the
+        # float operands keep the SQL division from truncating.
+        await Course.filter(id=course.id).update(
+            review_count=F("review_count") + 1,
+            rating_sum=F("rating_sum") + rate,
+            weighted_rating=(
+                F("rating_sum") + rate + float(prior.weight) * float(prior.mean)
+            )
+            / (F("review_count") + 1.0 + float(prior.weight)),
+            **{f"rating_{rate}": F(f"rating_{rate}") + 1},
         )
-    await Review.create(**data, course=course, student=student)
+
+    # the listings show the weighted rating and the histogram
+    await invalidate_course(slug=slug, listing=True)
 
     return {"detail": "review has been created."}
 
 
-async def reviews_course_list(*, slug: str) -> List[Dict]:
-    """Get all  reviews.
+async def reviews_course_list(
+    *, slug: str, limit: int, cursor: Optional[str] = None, rate: Optional[int] = None
+) -> Tuple[List[Dict], Optional[str]]:
+    """Get page of reviews, latest first.
 
     Args:
         slug: The slug of course.
+        limit: Page size.
+        cursor: Cursor of the page.
+        rate: Only the reviews with this rate.
 
     Returns:
-        List of reviews.
+        List of reviews and the cursor of the next page.
     """
-    course = await Course.get(is_drift=False, is_active=True, slug=slug)
-    review_list = []
+    course = await get_published_course_ref(slug=slug)
+
+    reviews = Review.filter(course_id=course.id)
 
-    for review in await course.reviews.all():
-        student = await review.student
-        user = await student.user
-        review_list.append(
+    if rate:
+        reviews = reviews.filter(rate=rate)
+
+    rows, next_cursor = await paginate(
+        queryset=reviews,
+        limit=limit,
+        cursor=cursor,
+        review="review",
+        rate="rate",
+        username="student__user__username",
+    )
+
+    return (
+        [
             {
-                "review": f"{review.review}",
-                "rate": {review.rate},
-                "user": {"username": user.username},
+                "review": row["review"],
+                "rate": row["rate"],
+                "user": {"username": row["username"]},
             }
-        )
-
-    return review_list
+            for row in rows
+        ],
+        next_cursor,
+    )
 
 
 async def create_course_section(*, data: Dict, course: Course,) -> Dict:
@@ -317,7 +769,9 @@ async def create_course_section(*, data: Dict, course: Course,) -> Dict:
     Raises:
         HTTPException: if the same section was created before.
     """
-    section, created = await Section.get_or_create(**data, course=course)
+    section, created = await Section.get_or_create(
+        **data, course=course, defaults={"slug": unique_slug(title=data["title"])}
+    )
 
     if not created:
         raise HTTPException(
@@ -325,8 +779,7 @@ async def create_course_section(*, data: Dict, course: Course,) -> Dict:
             detail="This section was been created before",
         )
 
-    section.slug = unique_slug(title=section.title)
-    await section.save()
+    await invalidate_course(slug=course.slug)
 
     return {
         "title": section.title,
@@ -336,15 +789,121 @@ async def create_course_section(*, data: Dict, course: Course,) -> Dict:
     }
 
 
+async def create_course_curriculum(*, data: Dict, course: Course) -> List[Dict]:
+    """Create sections with their lectures and assignments in one transaction.
+
+    Slugs are generated in memory and every table is filled with a single
+    bulk insert, whatever the size of the tree.
+
+    Args:
+        data: Dict of the curriculum tree.
+        course: Course instance.
+
+    Returns:
+        The created sections with their lectures and assignments slugs.
+
+    Raises:
+        HTTPException: if a section with the same order was created before.
+    """
+    sections: List[Section] = []
+    lectures: List[Lecture] = []
+    assignments: List[Assignment] = []
+    tree = []
+
+    for section_data in data["sections"]:
+        lectures_data = section_data.pop("lectures")
+        assignments_data = section_data.pop("assignments")
+
+        section = Section(
+            **section_data,
+            course=course,
+            slug=unique_slug(title=section_data["title"]),
+        )
+
+        section_lectures = [
+            Lecture(
+                **lecture_data,
+                section_id=section.id,
+                slug=unique_slug(title=lecture_data["title"]),
+            )
+            for lecture_data in lectures_data
+        ]
+
+        section_assignments = [
+            Assignment(
+                **assignment_data,
+                section_id=section.id,
+                slug=unique_slug(title=assignment_data["title"]),
+            )
+            for assignment_data in assignments_data
+        ]
+
+        sections.append(section)
+        lectures += section_lectures
+        assignments += section_assignments
+
+        tree.append(
+            {
+                "title": section.title,
+                "order": section.order,
+                "slug": section.slug,
+                "lectures": [
+                    {
+                        "title": lecture.title,
+                        "order": lecture.order,
+                        "slug": lecture.slug,
+                    }
+                    for lecture in section_lectures
+                ],
+                "assignments": [
+                    {"title": assignment.title, "slug": assignment.slug}
+                    for assignment in section_assignments
+                ],
+            }
+        )
+
+    async with in_transaction():
+        if await Section.exists(
+            course=course, order__in=[section.order for section in sections]
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="A section with the same order was been created before",
+            )
+
+        await Section.bulk_create(sections)
+
+        if lectures:
+            first = await reserve_lecture_ordinals(
+                course_id=course.id, count=len(lectures)
+            )
+
+            for ordinal, lecture in enumerate(lectures, start=first):
+                lecture.ordinal = ordinal
+
+            await Lecture.bulk_create(lectures)
+
+        if assignments:
+            await Assignment.bulk_create(assignments)
+
+    await invalidate_course(slug=course.slug)
+
+    return tree
+
+
 async def create_course_announcement(
-    *, data: Dict, course: Course, teacher: Teacher
+    *, data: Dict, course: Course, teacher: Teacher, background_tasks: BackgroundTasks
 ) -> Dict:
     """Create course announcement.
 
+    The announcement is delivered to the enrolled students after the
+    response is sent.
+
     Args:
         data: Dict of data for section creation.
         course: Course instance.
         teacher: Teacher instance.
+        background_tasks: Tasks to run after the response.
 
     Returns:
         The created announcement info.
@@ -353,7 +912,10 @@ async def create_course_announcement(
         HTTPException: if the same section was created before.
     """
     announcement, created = await Announcement.get_or_create(
-        **data, course=course, teacher=teacher
+        **data,
+        course=course,
+        teacher=teacher,
+        defaults={"slug": unique_slug(title=data["title"])},
     )
 
     if not created:
@@ -362,22 +924,211 @@ async def create_course_announcement(
             detail="This announcement was been created before",
         )
 
-    announcement.slug = unique_slug(title=announcement.title)
-    await announcement.save()
-
-    return {
+    info = {
         "title": announcement.title,
         "description": announcement.description,
         "slug": announcement.slug,
     }
 
+    background_tasks.add_task(
+        notification_hub.publish,
+        channel=course_channel(course_id=course.id),
+        event="announcement",
+        data={**info, "course": course.title, "course_slug": course.slug},
+    )
+    background_tasks.add_task(
+        deliver_announcement, announcement_id=announcement.id, course_id=course.id
+    )
+
+    return info
+
+
+def course_channel(*, course_id: Any) -> str:
+    """Notifications channel of a course.
+
+    Args:
+        course_id: The course primary key.
+
+    Examples:
+        >>> from teached.courses.services import course_channel
+        >>> course_channel(course_id=7)
+        'course:7'
+
+    Returns:
+        The channel name.
+    """
+    return f"course:{course_id}"
+
+
+async def get_student_channels(*, student: Any) -> List[str]:
+    """Notifications channels of the courses a student enrolled to.
+
+    Args:
+        student: Student instances.
+
+    Returns:
+        The channel names.
+    """
+    return [
+        course_channel(course_id=course_id)
+        for course_id in await Enrollment.filter(student=student).values_list(
+            "course_id", flat=True
+        )
+    ]
+
+
+async def deliver_announcement(*, announcement_id: Any, course_id: Any) -> int:
+    """Copy an announcement into the inbox of every enrolled student.
+
+    The students are walked in chunks along the enrollment unique index and
+    every chunk is one bulk insert, so no transaction spans the whole course.
+
+    Args:
+        announcement_id: The announcement primary key.
+        course_id: The course primary key.
+
+    Returns:
+        Number of delivered inbox items.
+    """
+    enrollments = Enrollment.filter(course_id=course_id).order_by("student_id")
+    delivered = 0
+    students: List[Any] = []
+
+    with metrics.timer("announcements.delivery"):
+        while True:
+            students = (
+                await (
+                    enrollments.filter(student_id__gt=students[-1])
+                    if students
+                    else enrollments
+                )
+                .limit(settings.BULK_CHUNK_SIZE)
+                .values_list("student_id", flat=True)
+            )
+
+            if not students:
+                break
+
+            await InboxItem.bulk_create(
+                [
+                    InboxItem(student_id=student_id, announcement_id=announcement_id)
+                    for student_id in students
+                ]
+            )
+
+            delivered += len(students)
+
+    metrics.incr("announcements.delivered", delivered)
+
+    return delivered
+
+
+async def get_inbox(
+    *, student: Any, limit: int, cursor: Optional[str] = None
+) -> Tuple[List[Dict], Optional[str]]:
+    """Get page of delivered announcements, latest first.
+
+    Args:
+        student: Student instances.
+        limit: Page size.
+        cursor: Cursor of the page.
+
+    Returns:
+        List of announcements and the cursor of the next page.
+    """
+    return await paginate(
+        queryset=InboxItem.filter(student=student),
+        limit=limit,
+        cursor=cursor,
+        title="announcement__title",
+        description="announcement__description",
+        slug="announcement__slug",
+        course="announcement__course__title",
+        course_slug="announcement__course__slug",
+    )
+
+
+async def reserve_lecture_ordinals(*, course_id: Any, count: int) -> int:
+    """Reserve ordinals for new lectures of a course, run it in a transaction.
+
+    The counter row stays locked until the transaction ends, so concurrent
+    reservations get distinct ordinals.
+
+    Args:
+        course_id: The id of course.
+        count: Number of new lectures.
+
+    Returns:
+        The first reserved ordinal.
+    """
+    await Course.filter(id=course_id).update(lecture_count=F("lecture_count") + count)
+
+    lecture_count = await Course.filter(id=course_id).values_list(
+        "lecture_count", flat=True
+    )
+
+    return lecture_count[0] - count
+
+
+async def assign_lecture_ordinal(*, lecture_id: Any, course_id: Any) -> int:
+    """Give an ordinal to a lecture created before the progress tracking.
+
+    If a concurrent call numbers the lecture first, the reserved ordinal is
+    given back, nothing could reserve after it while the course row is
+    locked.
+
+    Args:
+        lecture_id: The id of lecture.
+        course_id: The id of its course.
+
+    Returns:
+        The ordinal of the lecture.
+    """
+    async with in_transaction():
+        ordinal = await reserve_lecture_ordinals(course_id=course_id, count=1)
+
+        if await Lecture.filter(id=lecture_id, ordinal__isnull=True).update(
+            ordinal=ordinal
+        ):
+            return ordinal
+
+        await Course.filter(id=course_id).update(lecture_count=F("lecture_count") - 1)
+
+    ordinals = await Lecture.filter(id=lecture_id).values_list("ordinal", flat=True)
+
+    return ordinals[0]
+
+
+async def backfill_lecture_ordinals() -> int:
+    """Number the lectures created before the progress tracking.
+
+    Every lecture is numbered in its own transaction, so it can run next to
+    the workers, which number the lectures they meet first on completion.
+
+    Returns:
+        Number of numbered lectures.
+    """
+    lectures = (
+        await Lecture.filter(ordinal__isnull=True)
+        .order_by("created_at")
+        .values("id", course_id="section__course_id")
+    )
+
+    for row in lectures:
+        await assign_lecture_ordinal(lecture_id=row["id"], course_id=row["course_id"])
+
+    return len(lectures)
+
 
-async def create_section_lecture(*, data: Dict, section_slug: str) -> Dict:
+async def create_section_lecture(
+    *, data: Dict, section_slug: str, course: Course
+) -> Dict:
     """Create section lecture.
 
     Args:
         data: Dict of data for section creation.
         section_slug: The slug of the section.
+        course: Course instance.
 
     Returns:
         The created lecture info.
@@ -385,34 +1136,42 @@ async def create_section_lecture(*, data: Dict, section_slug: str) -> Dict:
     Raises:
         HTTPException: if the same lecture was created before.
     """
-    section = await Section.get(slug=section_slug)
+    section = await Section.get(slug=section_slug, course=course)
 
-    lecture, created = await Lecture.get_or_create(**data, section=section)
+    async with in_transaction():
+        if await Lecture.exists(**data, section=section):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="This lecture was been created before",
+            )
 
-    if not created:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="This lecture was been created before",
+        lecture = await Lecture.create(
+            **data,
+            section=section,
+            slug=unique_slug(title=data["title"]),
+            ordinal=await reserve_lecture_ordinals(course_id=course.id, count=1),
         )
 
-    lecture.slug = unique_slug(title=lecture.title)
-    await lecture.save()
+    await invalidate_course(slug=course.slug)
 
     return {
         "title": lecture.title,
         "text": lecture.text,
         "video": lecture.video,
-        "order": section.order,
-        "slug": section.slug,
+        "order": lecture.order,
+        "slug": lecture.slug,
     }
 
 
-async def create_section_assignment(*, data: Dict, section_slug: str) -> Dict:
+async def create_section_assignment(
+    *, data: Dict, section_slug: str, course: Course
+) -> Dict:
     """Create section assignment.
 
     Args:
         data: Dict of data for section creation.
         section_slug: The slug of the section.
+        course: Course instance.
 
     Returns:
         The created assignment info.
@@ -420,9 +1179,11 @@ async def create_section_assignment(*, data: Dict, section_slug: str) -> Dict:
     Raises:
         HTTPException: if the same assignment was created before.
     """
-    section = await Section.get(slug=section_slug)
+    section = await Section.get(slug=section_slug, course=course)
 
-    assignment, created = await Assignment.get_or_create(**data, section=section)
+    assignment, created = await Assignment.get_or_create(
+        **data, section=section, defaults={"slug": unique_slug(title=data["title"])}
+    )
 
     if not created:
         raise HTTPException(
@@ -430,14 +1191,13 @@ async def create_section_assignment(*, data: Dict, section_slug: str) -> Dict:
             detail="This assignment was been created before",
         )
 
-    assignment.slug = unique_slug(title=assignment.title)
-    await assignment.save()
+    await invalidate_course(slug=course.slug)
 
     return {
         "title": assignment.title,
         "text": assignment.description,
         "file": assignment.file,
-        "slug": section.slug,
+        "slug": assignment.slug,
     }
 
 
@@ -456,9 +1216,159 @@ async def update_course_settings(*, data: Dict, teacher: Teacher, slug: str) ->
     await courses.update(**data)
     course = await courses.first()
 
+    await invalidate_course_ref(slug=slug)
+    await invalidate_course(slug=slug, listing=True)
+
     return {
         "is_drift": course.is_drift,
         "price": course.price,
         "discount": course.discount,
         "is_active": course.is_active,
     }
+
+
+async def recompute_course_aggregates() -> int:
+    """Rebuild the denormalized enrollment, lecture and review aggregates.
+
+    Lectures without an ordinal are numbered after the existing ones.
+
+    Returns:
+        Number of repaired courses.
+    """
+    async with in_transaction():
+        enrollments = {
+            row["course_id"]: row["count"]
+            for row in await Enrollment.all()
+            .group_by("course_id")
+            .annotate(count=Count("id"))
+            .values("course_id", "count")
+        }
+
+        reviews = {
+            row["course_id"]: (row["count"], row["total"])
+            for row in await Review.all()
+            .group_by("course_id")
+            .annotate(count=Count("id"), total=Sum("rate"))
+            .values("course_id", "count", "total")
+        }
+
+        stars = {
+            (row["course_id"], row["rate"]): row["count"]
+            for row in await Review.all()
+            .group_by("course_id", "rate")
+            .annotate(count=Count("id"))
+            .values("course_id", "rate", "count")
+        }
+
+        lectures = (
+            await Lecture.all()
+            .order_by("created_at")
+            .values("id", "ordinal", course_id="section__course_id")
+        )
+
+        lecture_counts: Dict[Any, int] = {}
+
+        for row in lectures:
+            if row["ordinal"] is not None:
+                lecture_counts[row["course_id"]] = max(
+                    lecture_counts.get(row["course_id"], 0), row["ordinal"] + 1
+                )
+
+        # lectures created before the progress tracking get the next ordinals
+        for row in lectures:
+            if row["ordinal"] is None:
+                ordinal = lecture_counts.get(row["course_id"], 0)
+                lecture_counts[row["course_id"]] = ordinal + 1
+
+                await Lecture.filter(id=row["id"]).update(ordinal=ordinal)
+
+        course_ids = await Course.all().values_list("id", flat=True)
+
+        for course_id in course_ids:
+            review_count, rating_sum = reviews.get(course_id, (0, 0))
+
+            await Course.filter(id=course_id).update(
+                enrollment_count=enrollments.get(course_id, 0),
+                lecture_count=lecture_counts.get(course_id, 0),
+                review_count=review_count,
+                rating_sum=rating_sum or 0,
+                **{
+                    f"rating_{star}": stars.get((course_id, star), 0)
+                    for star in range(1, 6)
+                },
+            )
+
+    return len(course_ids)
+
+
+async def decay_trending_scores() -> float:
+    """Decay the trending score of every course by the time since last decay.
+
+    The scores halve every TRENDING_HALF_LIFE seconds, so an enrollment
+    weighs less the older it is. Scores too small to matter are reset.
+
+    Returns:
+        The decay factor, 1 on the first run.
+    """
+    now = utc_now()
+
+    watermark, created = await RollupWatermark.get_or_create(
+        name=TRENDING_WATERMARK, defaults={"value": now}
+    )
+
+    if created:
+        return 1
+
+    factor = 0.5 ** (
+        (now - as_utc(moment=watermark.value)).total_seconds()
+        / settings.TRENDING_HALF_LIFE
+    )
+
+    async with in_transaction():
+        # a concurrent decay has already covered this time
+        if not await RollupWatermark.filter(
+            name=TRENDING_WATERMARK, value=watermark.value
+        ).update(value=now):
+            return 1
+
+        await Course.filter(trending_score__gt=0).update(
+            trending_score=F("trending_score") * factor
+        )
+
+        await Course.filter(trending_score__gt=0, trending_score__lt=0.01).update(
+            trending_score=0
+        )
+
+    return factor
+
+
+async def recompute_rating_prior() -> RatingPrior:
+    """Recompute the rating prior and the weighted rating of every course.
+
+    The prior mean is the average rating of the catalog and its weight is
+    the average number of reviews of a reviewed course.
+
+    Returns:
+        The new prior.
+    """
+    aggregates = await Course.filter(review_count__gt=0).values_list(
+        "review_count", "rating_sum"
+    )
+
+    review_count = sum(count for count, _ in aggregates)
+
+    prior = await RatingPrior.first() or RatingPrior()
+    prior.mean = (
+        sum(total for _, total in aggregates) / review_count if aggregates else 0.0
+    )
+    prior.weight = review_count / len(aggregates) if aggregates else 0.0
+
+    async with in_transaction():
+        await prior.save()
+
+        await Course.filter(review_count__gt=0).update(
+            weighted_rating=(F("rating_sum") + float(prior.weight * prior.mean))
+            / (F("review_count") + float(prior.weight))
+        )
+
+    return prior
@@ -0,0 +1,195 @@
+"""Shared memory-mapped snapshot of the published course catalog."""
+import mmap
+import os
+import struct
+import tempfile
+from typing import Optional
+
+from fastapi.encoders import jsonable_encoder
+
+from teached.settings import settings
+from teached.shortcuts import json_bytes
+
+from .models import CourseListPydantic  # noqa I202
+from .services import get_published_courses
+
+MAGIC = b"TCHDSNAP"
+
+# magic, generation, payload size
+HEADER = struct.Struct("<8sQQ")
+
+
+def read_generation(*, path: str) -> int:
+    """Read the generation number stored in a snapshot header.
+
+    Args:
+        path: The snapshot file path.
+
+    Examples:
+        >>> import tempfile
+        >>> from teached.courses.snapshot import read_generation, write_snapshot
+        >>> path = f"{tempfile.mkdtemp()}/catalog.snapshot"
+        >>> read_generation(path=path)
+        0
+        >>> write_snapshot(path=path, payload=b"[]")
+        1
+        >>> read_generation(path=path)
+        1
+
+    Returns:
+        The generation or 0 if there is no valid snapshot.
+    """
+    try:
+        with open(path, "rb") as snapshot:
+            header = snapshot.read(HEADER.size)
+
+    except FileNotFoundError:
+        return 0
+
+    if len(header) != HEADER.size:
+        return 0
+
+    magic, generation, _ = HEADER.unpack(header)
+
+    return generation if magic == MAGIC else 0
+
+
+def write_snapshot(*, path: str, payload: bytes) -> int:
+    """Atomically publish a new snapshot generation.
+
+    The snapshot is written to a temporary file next to the target and then
+    renamed over it, so readers either see the old or the new generation.
+
+    Args:
+        path: The snapshot file path.
+        payload: Serialized catalog.
+
+    Examples:
+        >>> import os
+        >>> import tempfile
+        >>> from teached.courses.snapshot import write_snapshot
+        >>> path = f"{tempfile.mkdtemp()}/catalog.snapshot"
+        >>> write_snapshot(path=path, payload=b"[]")
+        1
+        >>> oct(os.stat(path).st_mode & 0o777)
+        '0o644'
+
+    Returns:
+        The new generation number.
+    """
+    generation = read_generation(path=path) + 1
+
+    directory = os.path.dirname(os.path.abspath(path))
+
+    descriptor, tmp_path = tempfile.mkstemp(dir=directory, prefix=".catalog-")
+
+    try:
+        with os.fdopen(descriptor, "wb") as snapshot:
+            snapshot.write(HEADER.pack(MAGIC, generation, len(payload)))
+            snapshot.write(payload)
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+
+        # mkstemp creates the file 0600, the workers may run as another user
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+    return generation
+
+
+class SnapshotReader:
+    """Read-only view over the snapshot shared by all workers.
+
+    Every worker maps the same file, so the catalog pages live once in the
+    OS page cache no matter how many workers are running.
+    """
+
+    def __init__(self: "SnapshotReader", *, path: str) -> None:
+        """Set up the reader.
+
+        Args:
+            path: The snapshot file path.
+        """
+        self.path = path
+        self.generation = 0
+        self._inode: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+
+    def _remap(self: "SnapshotReader") -> None:
+        """Map the current snapshot file if a new generation was published."""
+        try:
+            stat = os.stat(self.path)
+
+        except FileNotFoundError:
+            return
+
+        if stat.st_ino == self._inode or stat.st_size < HEADER.size:
+            return
+
+        with open(self.path, "rb") as snapshot:
+            new_map = mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, generation, size = HEADER.unpack_from(new_map)
+
+        if magic != MAGIC or HEADER.size + size > len(new_map):
+            new_map.close()
+            return
+
+        # the old map is not closed, responses may still hold views of it,
+        # it is unmapped once the last of them is released
+        self._map, self._inode, self.generation = new_map, stat.st_ino, generation
+
+    def read(self: "SnapshotReader") -> Optional[memoryview]:
+        """Return a view of the payload of the latest generation, without a copy.
+
+        Examples:
+            >>> import tempfile
+            >>> from teached.courses.snapshot import SnapshotReader, write_snapshot
+            >>> path = f"{tempfile.mkdtemp()}/catalog.snapshot"
+            >>> reader = SnapshotReader(path=path)
+            >>> reader.read() is None
+            True
+            >>> write_snapshot(path=path, payload=b"[1]")
+            1
+            >>> reader.read().tobytes()
+            b'[1]'
+            >>> write_snapshot(path=path, payload=b"[1, 2]")
+            2
+            >>> reader.read().tobytes(), reader.generation
+            (b'[1, 2]', 2)
+
+        Returns:
+            The serialized catalog or None if no snapshot was published yet.
+        """
+        self._remap()
+
+        if self._map is None:
+            return None
+
+        _, _, size = HEADER.unpack_from(self._map)
+
+        view = memoryview(self._map)  # type: ignore
+
+        return view[HEADER.size : HEADER.size + size]
+
+
+async def build_catalog() -> bytes:
+    """Serialize the published course listing.
+
+    Returns:
+        The listing as JSON bytes.
+    """
+    courses = await CourseListPydantic.from_queryset(await get_published_courses())
+
+    return json_bytes(jsonable_encoder(courses))
+
+
+catalog_reader = (
+    SnapshotReader(path=settings.CATALOG_SNAPSHOT_PATH)
+    if settings.CATALOG_SNAPSHOT_PATH
+    else None
+)
@@ -1,11 +1,71 @@
 """Collection of utils functions."""
+import asyncio
+import hashlib
+import os
+import re
 import secrets
+import socket
 import string
+import threading
+import time
+import unicodedata
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Dict, Optional
 
+from teached.metrics import metrics
 from teached.settings import settings
 
 chars_string = string.ascii_lowercase + string.digits + string.ascii_uppercase
 
+BASE62 = string.digits + string.ascii_uppercase + string.ascii_lowercase
+
+# Letters without a decomposition into an ASCII base letter.
+LETTERS = {
+    "ß": "ss",
+    "æ": "ae",
+    "Æ": "AE",
+    "œ": "oe",
+    "Œ": "OE",
+    "ø": "o",
+    "Ø": "O",
+    "đ": "d",
+    "Đ": "D",
+    "ð": "d",
+    "Ð": "D",
+    "ł": "l",
+    "Ł": "L",
+    "þ": "th",
+    "Þ": "Th",
+    "ı": "i",
+}
+
+
+def _slug_table() -> Dict[int, str]:
+    """Build the slugify translation table.
+
+    Punctuation and whitespace become "-" and the Latin letters up to Latin
+    Extended-B lose their accents.
+
+    Returns:
+        Table for str.translate.
+    """
+    table = {ord(char): "-" for char in string.punctuation + string.whitespace}
+    del table[ord("-")]
+
+    for code in range(0xC0, 0x250):
+        base = unicodedata.normalize("NFKD", chr(code))[0]
+
+        if base.isascii() and base.isalpha():
+            table[code] = base
+
+    table.update({ord(char): value for char, value in LETTERS.items()})
+
+    return table
+
+
+SLUG_TABLE = _slug_table()
+
 
 def slugify(*, value: str) -> str:
     r"""Slugify function.
@@ -18,17 +78,108 @@ def slugify(*, value: str) -> str:
         >>> title = "super long_title/to\\slugify@it"
         >>> slugify(value=title)
         super-long-title-to-slugify-it
+        >>> slugify(value="Crème brûlée für Anfänger?")
+        creme-brulee-fur-anfanger
+        >>> slugify(value="Straße Łódź")
+        strasse-lodz
+        >>> slugify(value="--Python 3 -- 日本語 入門!")
+        python-3
 
     Returns:
         The slugify text.
     """
-    return (
-        value.replace(" ", "-")
-        .replace("_", "-")
-        .replace("/", "-")
-        .replace("\\", "-")
-        .replace("@", "-")
-    )
+    value = value.translate(SLUG_TABLE).lower()
+    value = re.sub(r"[^a-z0-9-]", "", value)
+
+    return re.sub(r"-+", "-", value).strip("-")
+
+
+def base62(*, value: int, width: int) -> str:
+    """Encode a number in base62, left padded to width.
+
+    The digits are ordered like ASCII, so encoded numbers of the same width
+    sort like the numbers themselves.
+
+    Args:
+        value: The number.
+        width: Minimum number of digits.
+
+    Examples:
+        >>> from teached.courses.utils import base62
+        >>> base62(value=61, width=3), base62(value=62, width=3)
+        ('00z', '010')
+
+    Returns:
+        The encoded number.
+    """
+    digits = []
+
+    while value:
+        value, digit = divmod(value, 62)
+        digits.append(BASE62[digit])
+
+    return "".join(reversed(digits)).rjust(width, "0")
+
+
+class SlugIds:
+    """Time sortable ids that never repeat within a process.
+
+    An id is a logical clock, milliseconds times 3844 plus a sequence, so
+    3844 ids fit in a millisecond before the clock is pushed forward, and
+    it never goes back even if the system clock does. The process tag keeps
+    the ids of different processes apart.
+    """
+
+    def __init__(self: "SlugIds", *, tag: str = None) -> None:
+        """Set up the generator.
+
+        Args:
+            tag: Process tag, the one of process_tag when not given.
+        """
+        self.tag = tag or process_tag()
+        self._last = 0
+        self._lock = threading.Lock()
+
+    def next(self: "SlugIds") -> str:
+        """Generate the next id.
+
+        Examples:
+            >>> from teached.courses.utils import SlugIds
+            >>> ids = SlugIds(tag="test")
+            >>> first, second = ids.next(), ids.next()
+            >>> len(first), first < second, first.endswith("test")
+            (13, True, True)
+
+        Returns:
+            9 time digits followed by the process tag.
+        """
+        with self._lock:
+            self._last = max(int(time.time() * 1000) * 3844, self._last + 1)
+            value = self._last
+
+        return base62(value=value, width=9) + self.tag
+
+
+def process_tag() -> str:
+    """Tag the ids of this process by its host and pid.
+
+    The pid tells apart the processes of a host and the digest of the host
+    name the hosts, containers included since each has its own host name.
+
+    Examples:
+        >>> import os
+        >>> from teached.courses.utils import base62, process_tag
+        >>> tag = process_tag()
+        >>> len(tag), tag.endswith(base62(value=os.getpid(), width=4))
+        (8, True)
+
+    Returns:
+        4 host digits followed by 4 pid digits.
+    """
+    digest = hashlib.blake2b(socket.gethostname().encode(), digest_size=8)
+    host = int.from_bytes(digest.digest(), "big") % 62 ** 4
+
+    return base62(value=host, width=4) + base62(value=os.getpid(), width=4)
 
 
 def random_string(
@@ -54,6 +205,82 @@ def random_string(
     return "".join(secrets.choice(chars) for _ in range(size))
 
 
+slug_ids = SlugIds()
+
+
+def set_bit(*, bitmap: str, index: int) -> str:
+    """Set a bit of a hex encoded bitmap.
+
+    Args:
+        bitmap: Hex of the bitmap, empty for no bit set.
+        index: The bit to set.
+
+    Examples:
+        >>> from teached.courses.utils import set_bit
+        >>> set_bit(bitmap="", index=0)
+        '1'
+        >>> set_bit(bitmap="1", index=9)
+        '201'
+
+    Returns:
+        Hex of the new bitmap.
+    """
+    return format(int(bitmap or "0", 16) | 1 << index, "x")
+
+
+def count_bits(*, bitmap: str) -> int:
+    """Count the set bits of a hex encoded bitmap.
+
+    Args:
+        bitmap: Hex of the bitmap.
+
+    Examples:
+        >>> from teached.courses.utils import count_bits
+        >>> count_bits(bitmap="201"), count_bits(bitmap="")
+        (2, 0)
+
+    Returns:
+        Number of set bits.
+    """
+    return bin(int(bitmap or "0", 16)).count("1")
+
+
+def utc_now() -> datetime:
+    """Current time, timezone aware in UTC.
+
+    Returns:
+        The aware datetime.
+    """
+    return datetime.now(timezone.utc)
+
+
+def as_utc(*, moment: datetime) -> datetime:
+    """Make a datetime read from the database aware in UTC.
+
+    Postgres returns aware datetimes while sqlite returns the naive UTC
+    values Tortoise has stored, both are compared after this.
+
+    Args:
+        moment: The datetime, naive ones are taken as UTC.
+
+    Examples:
+        >>> from datetime import datetime, timedelta, timezone
+        >>> from teached.courses.utils import as_utc
+        >>> as_utc(moment=datetime(2020, 6, 20, 10))
+        datetime.datetime(2020, 6, 20, 10, 0, tzinfo=datetime.timezone.utc)
+        >>> paris = timezone(timedelta(hours=2))
+        >>> as_utc(moment=datetime(2020, 6, 20, 12, tzinfo=paris))
+        datetime.datetime(2020, 6, 20, 10, 0, tzinfo=datetime.timezone.utc)
+
+    Returns:
+        The aware datetime.
+    """
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+
+    return moment.astimezone(timezone.utc)
+
+
 def unique_slug(*, title: str, new_slug: str = None) -> str:
     """Create unique slug.
 
@@ -63,7 +290,11 @@ def unique_slug(*, title: str, new_slug: str = None) -> str:
 
     Examples:
         >>> from teached.courses.utils import unique_slug
-        >>> len(unique_slug(title="title")) == 12
+        >>> len(unique_slug(title="title")) == 23
+        True
+        >>> unique_slug(title="日本語").startswith("-")
+        False
+        >>> unique_slug(title="title") != unique_slug(title="title")
         True
         >>> unique_slug(title="title", new_slug="default-slug") == "default-slug"
         True
@@ -74,8 +305,80 @@ def unique_slug(*, title: str, new_slug: str = None) -> str:
     """
     if new_slug is None:
 
-        slug = slugify(value=title)
+        slug = slugify(value=title)[:100].rstrip("-")
 
-        new_slug = f"{slug}-{random_string()}"
+        new_slug = f"{slug}-{slug_ids.next()}" if slug else slug_ids.next()
 
     return new_slug
+
+
+# Slots of the fan out running the current fetch, shared by the nested ones.
+fan_out_slots: "ContextVar[Optional[asyncio.Semaphore]]" = ContextVar(
+    "fan_out_slots", default=None
+)
+
+
+async def fan_out(
+    *, name: str, limit: int = settings.FAN_OUT_CONCURRENCY, **fetches: Awaitable
+) -> Dict[str, Any]:
+    """Run independent fetches concurrently and time each of them.
+
+    A fan out started by one of the fetches shares the slots of the outer
+    one, and the fetch gives its slot back while it waits for the nested
+    fetches. So a request never runs more than limit queries at once,
+    however deep the fan outs are nested.
+
+    Args:
+        name: Metrics prefix, every fetch is timed as name.key.
+        limit: Maximum fetches running at the same time.
+        fetches: Awaitables by key.
+
+    Examples:
+        >>> import asyncio
+        >>> from teached.courses.utils import fan_out
+        >>> async def fetch(value):
+        ...     return value
+        >>> loop = asyncio.new_event_loop()
+        >>> loop.run_until_complete(fan_out(name="test", a=fetch(1), b=fetch(2)))
+        {'a': 1, 'b': 2}
+        >>> running, peak = set(), set()
+        >>> async def query(key):
+        ...     running.add(key)
+        ...     peak.add(len(running))
+        ...     await asyncio.sleep(0.01)
+        ...     running.discard(key)
+        >>> async def nested():
+        ...     return await fan_out(name="test", limit=2, c=query(3), d=query(4))
+        >>> _ = loop.run_until_complete(
+        ...     fan_out(name="test", limit=2, n=nested(), a=query(1), b=query(2))
+        ... )
+        >>> max(peak)
+        2
+
+    Returns:
+        The results by key.
+    """
+    outer = fan_out_slots.get()
+    slots = outer if outer is not None else asyncio.Semaphore(limit)
+
+    async def run(key: str, fetch: Awaitable) -> Any:
+        async with slots:
+            # each fetch runs in its own task, only its nested fan outs see it
+            fan_out_slots.set(slots)
+
+            with metrics.timer(f"{name}.{key}"):
+                return await fetch
+
+    if outer is not None:
+        outer.release()
+
+    try:
+        results = await asyncio.gather(
+            *(run(key, fetch) for key, fetch in fetches.items())
+        )
+
+    finally:
+        if outer is not None:
+            await outer.acquire()
+
+    return dict(zip(fetches, results))
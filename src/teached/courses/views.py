@@ -1,51 +1,101 @@
 """Views for courses app."""
 from typing import Dict, List, Tuple
 
-from fastapi import APIRouter, Depends, Request, status
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.encoders import jsonable_encoder
 
+from teached.conditional import conditional_response
+from teached.pagination import set_next_link
+from teached.shortcuts import json_bytes
 from teached.users import depends, models
 
 from . import schema  # noqa I202
-from .depends import Course, Teacher, is_owner
+from .analytics import course_stats
+from .cache import LIST_GROUP, cached_response, course_group, detail_key, list_key
+from .depends import Course, Teacher, is_course_owner, is_owner, is_published_owner
+from .enum import CourseSort, StatPeriod
 from .models import CourseListPydantic
 from .services import (
     bookmark_a_published_course,
     create_course,
     create_course_announcement,
+    create_course_curriculum,
     create_course_section,
     create_review_for_published_course,
     create_section_assignment,
     create_section_lecture,
+    enroll_cohort,
     enroll_to_published_course,
     get_bookmarks,
     get_published_course,
     get_published_courses,
+    get_sorted_courses,
     reviews_course_list,
     update_course_settings,
 )
+from .snapshot import catalog_reader
 
 router = APIRouter()
 
 
 @router.get("/")
 async def course_list(
+    request: Request,
     search: str = None,
     category: str = None,
     language: str = None,
     level: str = None,
     price: str = None,
     discount: str = None,
-) -> List[CourseListPydantic]:
-    """Courses list."""
-    return await CourseListPydantic.from_queryset(
-        await get_published_courses(
-            search=search,
-            category=category,
-            language=language,
-            level=level,
-            price=price,
-            discount=discount,
+    sort: CourseSort = None,
+    cursor: str = None,
+    limit: int = Query(20, ge=1, le=100),
+) -> Response:
+    """Courses list, paginated when it is sorted."""
+    filters = {
+        "search": search,
+        "category": category,
+        "language": language,
+        "level": level,
+        "price": price,
+        "discount": discount,
+    }
+
+    if sort:
+        courses, next_cursor = await get_sorted_courses(
+            sort=sort, limit=limit, cursor=cursor, **filters
         )
+
+        response = conditional_response(
+            request=request,
+            body=json_bytes(
+                jsonable_encoder(await CourseListPydantic.from_queryset(courses))
+            ),
+        )
+        set_next_link(request=request, response=response, next_cursor=next_cursor)
+
+        return response
+
+    if catalog_reader and not any(filters.values()):
+        catalog = catalog_reader.read()
+
+        if catalog is not None:
+            return conditional_response(request=request, body=catalog)
+
+    async def build() -> List[CourseListPydantic]:
+        courses = await get_published_courses(**filters)
+        return await CourseListPydantic.from_queryset(courses)
+
+    return await cached_response(
+        request=request, key=list_key(**filters), group=LIST_GROUP, build=build,
     )
 
 
@@ -63,10 +113,18 @@ async def course_create(
 
 @router.get("/bookmarks/")
 async def bookmark_list(
+    request: Request,
+    response: Response,
+    cursor: str = None,
+    limit: int = Query(20, ge=1, le=100),
     auth_user: models.Student = Depends(depends.is_student),
 ) -> List[Dict]:
-    """List of Bookmark."""
-    return await get_bookmarks(student=auth_user)
+    """List of Bookmark, the next page is linked in the Link header."""
+    bookmarks, next_cursor = await get_bookmarks(
+        student=auth_user, limit=limit, cursor=cursor
+    )
+    set_next_link(request=request, response=response, next_cursor=next_cursor)
+    return bookmarks
 
 
 @router.post("/{slug}/bookmark/", status_code=status.HTTP_201_CREATED)
@@ -90,9 +148,24 @@ async def course_review(
 
 
 @router.get("/{slug}/review/")
-async def get_course_reviews(slug: str) -> List[Dict]:
-    """Get all course reviews."""
-    return await reviews_course_list(slug=slug)
+async def get_course_reviews(
+    request: Request,
+    slug: str,
+    cursor: str = None,
+    limit: int = Query(20, ge=1, le=100),
+    rate: int = Query(None, ge=1, le=5),
+) -> Response:
+    """Get course reviews, the next page is linked in the Link header."""
+    reviews, next_cursor = await reviews_course_list(
+        slug=slug, limit=limit, cursor=cursor, rate=rate
+    )
+
+    response = conditional_response(
+        request=request, body=json_bytes(jsonable_encoder(reviews))
+    )
+    set_next_link(request=request, response=response, next_cursor=next_cursor)
+
+    return response
 
 
 @router.patch("/{slug}/manage/settings/")
@@ -117,15 +190,50 @@ async def section_create(
     return await create_course_section(course=course, data=user_input.dict())
 
 
+@router.post("/{slug}/manage/curriculum/", status_code=status.HTTP_201_CREATED)
+async def curriculum_create(
+    user_input: schema.CreateCurriculum,
+    auth_user: Tuple[Teacher, Course] = Depends(is_owner),
+) -> List[Dict]:
+    """Create a whole curriculum tree for a course."""
+    _, course = auth_user
+    return await create_course_curriculum(course=course, data=user_input.dict())
+
+
+@router.post("/{slug}/manage/cohort/", status_code=status.HTTP_201_CREATED)
+async def cohort_enroll(
+    user_input: schema.CohortEnrollment,
+    auth_user: Tuple[Teacher, Course] = Depends(is_published_owner),
+) -> Dict:
+    """Enroll a whole class to a published course."""
+    _, course = auth_user
+    return await enroll_cohort(course=course, students=user_input.students)
+
+
+@router.get("/{slug}/manage/analytics/")
+async def course_analytics(
+    period: StatPeriod = StatPeriod.day,
+    span: int = Query(30, ge=1, le=366),
+    auth_user: Tuple[Teacher, Course] = Depends(is_published_owner),
+) -> Dict:
+    """Enrollments, revenue and rating of a published course over time."""
+    _, course = auth_user
+    return await course_stats(course=course, period=period, span=span)
+
+
 @router.post("/{slug}/manage/announcement/")
 async def announcement_create(
     user_input: schema.CreateAnnouncement,
-    auth_user: Tuple[Teacher, Course] = Depends(is_owner),
+    background_tasks: BackgroundTasks,
+    auth_user: Tuple[Teacher, Course] = Depends(is_course_owner),
 ) -> Dict:
-    """Create new announcement for a course."""
+    """Create new announcement for a course and deliver it to its students."""
     teacher, course = auth_user
     return await create_course_announcement(
-        teacher=teacher, course=course, data=user_input.dict()
+        teacher=teacher,
+        course=course,
+        data=user_input.dict(),
+        background_tasks=background_tasks,
     )
 
 
@@ -136,8 +244,11 @@ async def lecture_create(
     auth_user: Tuple[Teacher, Course] = Depends(is_owner),
 ) -> Dict:
     """Create new lecture for a section."""
+    _, course = auth_user
     return await create_section_lecture(
-        section_slug=section_slug, data=user_input.dict(exclude_unset=True)
+        section_slug=section_slug,
+        data=user_input.dict(exclude_unset=True),
+        course=course,
     )
 
 
@@ -148,15 +259,30 @@ async def assignment_create(
     auth_user: Tuple[Teacher, Course] = Depends(is_owner),
 ) -> Dict:
     """Create new assignment for a section."""
+    _, course = auth_user
     return await create_section_assignment(
-        section_slug=section_slug, data=user_input.dict(exclude_unset=True)
+        section_slug=section_slug,
+        data=user_input.dict(exclude_unset=True),
+        course=course,
     )
 
 
-@router.get("/{slug}/", response_model=schema.CourseDetail)
-async def course_detail(request: Request, slug: str) -> schema.CourseDetail:
+@router.get("/{slug}/", responses={200: {"model": schema.CourseDetail}})
+async def course_detail(request: Request, slug: str) -> Response:
     """Course detail."""
-    return await get_published_course(slug=slug, user=request.state.user)
+    if request.state.user:
+        course = await get_published_course(slug=slug, user=request.state.user)
+
+        return conditional_response(
+            request=request, body=json_bytes(jsonable_encoder(course))
+        )
+
+    return await cached_response(
+        request=request,
+        key=detail_key(slug=slug),
+        group=course_group(slug=slug),
+        build=lambda: get_published_course(slug=slug, user=None),
+    )
 
 
 @router.post("/{slug}/", status_code=status.HTTP_201_CREATED)
@@ -3,9 +3,12 @@ from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 from tortoise.contrib.fastapi import register_tortoise
 
-from . import __version__
+from . import __version__, metrics
 from .courses import classroom_views
 from .courses import views as courses_views
+from .courses.events import lecture_events
+from .courses.lookups import load_lookup_tables
+from .notifications import notification_hub
 from .settings import settings
 from .users import views as users_views
 from .users.middleware import AuthJWTMiddleware
@@ -28,6 +31,11 @@ app.add_middleware(
 )
 app.add_middleware(AuthJWTMiddleware)
 
+# Registered before tortoise so the last events are flushed before the
+# connections are closed on shutdown.
+app.add_event_handler("startup", lecture_events.start)
+app.add_event_handler("shutdown", lecture_events.stop)
+
 register_tortoise(
     app,
     db_url=settings.DATABASE_URL,
@@ -36,6 +44,11 @@ register_tortoise(
     add_exception_handlers=True,
 )
 
+app.add_event_handler("startup", load_lookup_tables)
+app.add_event_handler("startup", notification_hub.start)
+app.add_event_handler("shutdown", notification_hub.stop)
+
 app.include_router(users_views.router, prefix="/users", tags=["users"])
 app.include_router(courses_views.router, prefix="/courses", tags=["courses"])
 app.include_router(classroom_views.router, prefix="/my-classroom", tags=["classroom"])
+app.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
@@ -1,5 +1,6 @@
 """Command-line interface."""
-from typing import Dict
+import asyncio
+from typing import Dict, Optional
 
 import typer
 import uvicorn
@@ -31,6 +32,150 @@ async def run_tortoise(*, data: Dict, db_url: str = "sqlite://:memory:") -> None
     typer.secho(f"{user} hes been created", fg=typer.colors.BRIGHT_GREEN)
 
 
+async def run_catalog_snapshot(*, path: str, interval: int, db_url: str) -> None:
+    """Build the catalog snapshot, forever if interval is positive.
+
+    Args:
+        path: The snapshot file path.
+        interval: Seconds between two builds, 0 to build only once.
+        db_url: database URL.
+    """
+    from .courses.snapshot import build_catalog, write_snapshot
+
+    await Tortoise.init(db_url=db_url, modules={"models": settings.DB_MODELS})
+
+    await Tortoise.generate_schemas()
+
+    while True:
+        generation = write_snapshot(path=path, payload=await build_catalog())
+        typer.secho(
+            f"catalog snapshot generation {generation} has been published",
+            fg=typer.colors.BRIGHT_GREEN,
+        )
+
+        if interval <= 0:
+            break
+
+        await asyncio.sleep(interval)
+
+
+async def run_recompute_aggregates(*, db_url: str) -> None:
+    """Rebuild course aggregates.
+
+    Args:
+        db_url: database URL.
+    """
+    from .courses.services import recompute_course_aggregates
+
+    await Tortoise.init(db_url=db_url, modules={"models": settings.DB_MODELS})
+
+    await Tortoise.generate_schemas()
+
+    count = await recompute_course_aggregates()
+    typer.secho(
+        f"aggregates of {count} courses have been recomputed",
+        fg=typer.colors.BRIGHT_GREEN,
+    )
+
+
+async def run_backfill_lecture_ordinals(*, db_url: str) -> None:
+    """Number the lectures created before the progress tracking.
+
+    Args:
+        db_url: database URL.
+    """
+    from .courses import services
+
+    await Tortoise.init(db_url=db_url, modules={"models": settings.DB_MODELS})
+
+    await Tortoise.generate_schemas()
+
+    count = await services.backfill_lecture_ordinals()
+    typer.secho(
+        f"{count} lectures have been numbered", fg=typer.colors.BRIGHT_GREEN,
+    )
+
+
+async def run_recompute_rating_prior(*, db_url: str) -> None:
+    """Recompute the rating prior.
+
+    Args:
+        db_url: database URL.
+    """
+    from .courses import services
+
+    await Tortoise.init(db_url=db_url, modules={"models": settings.DB_MODELS})
+
+    await Tortoise.generate_schemas()
+
+    prior = await services.recompute_rating_prior()
+    typer.secho(f"rating prior is {prior}", fg=typer.colors.BRIGHT_GREEN)
+
+
+async def run_recompute_recommendations(*, full: bool, db_url: str) -> None:
+    """Recompute the course recommendations.
+
+    Args:
+        full: Whether to rank every course or only the new ones.
+        db_url: database URL.
+    """
+    from .courses import recommendations
+
+    await Tortoise.init(db_url=db_url, modules={"models": settings.DB_MODELS})
+
+    await Tortoise.generate_schemas()
+
+    count = await recommendations.recompute_recommendations(full=full)
+    typer.secho(
+        f"recommendations of {count} courses have been recomputed",
+        fg=typer.colors.BRIGHT_GREEN,
+    )
+
+
+async def run_decay_trending(*, db_url: str) -> None:
+    """Decay the trending scores.
+
+    Args:
+        db_url: database URL.
+    """
+    from .courses.services import decay_trending_scores
+
+    await Tortoise.init(db_url=db_url, modules={"models": settings.DB_MODELS})
+
+    await Tortoise.generate_schemas()
+
+    factor = await decay_trending_scores()
+    typer.secho(
+        f"trending scores have been decayed by {factor}", fg=typer.colors.BRIGHT_GREEN
+    )
+
+
+async def run_rollup_analytics(*, interval: int, db_url: str) -> None:
+    """Fold new rows into the analytics rollups, forever if interval is positive.
+
+    Args:
+        interval: Seconds between two rollups, 0 to rollup only once.
+        db_url: database URL.
+    """
+    from .courses.analytics import rollup_course_stats
+
+    await Tortoise.init(db_url=db_url, modules={"models": settings.DB_MODELS})
+
+    await Tortoise.generate_schemas()
+
+    while True:
+        count = await rollup_course_stats()
+        typer.secho(
+            f"{count} rows have been folded into the rollups",
+            fg=typer.colors.BRIGHT_GREEN,
+        )
+
+        if interval <= 0:
+            break
+
+        await asyncio.sleep(interval)
+
+
 @app.command()
 def version() -> None:
     """Show project Version."""
@@ -69,5 +214,97 @@ def create_superuser(
     )
 
 
+@app.command("build-catalog-snapshot")
+def build_catalog_snapshot(
+    path: Optional[str] = typer.Option(None, help="Defaults to the settings path."),
+    interval: int = typer.Option(
+        settings.CATALOG_SNAPSHOT_INTERVAL, help="Seconds between builds, 0 once."
+    ),
+) -> None:
+    """Publish the catalog snapshot shared by the web workers.
+
+    Run a single instance of this command next to the workers.
+
+    Args:
+        path: snapshot file path
+        interval: seconds between two builds
+
+    Raises:
+        Exit: If there is no snapshot path.
+    """
+    path = path or settings.CATALOG_SNAPSHOT_PATH
+
+    if not path:
+        typer.secho("CATALOG_SNAPSHOT_PATH is not set", fg=typer.colors.BRIGHT_RED)
+        raise typer.Exit(code=1)
+
+    run_async(
+        run_catalog_snapshot(path=path, interval=interval, db_url=settings.DATABASE_URL)
+    )
+
+
+@app.command("recompute-aggregates")
+def recompute_aggregates() -> None:
+    """Repair the enrollment and review counters of every course."""
+    run_async(run_recompute_aggregates(db_url=settings.DATABASE_URL))
+
+
+@app.command("backfill-lecture-ordinals")
+def backfill_lecture_ordinals() -> None:
+    """Number the lectures created before the progress tracking.
+
+    Run it once after upgrading, the workers keep serving meanwhile.
+    """
+    run_async(run_backfill_lecture_ordinals(db_url=settings.DATABASE_URL))
+
+
+@app.command("recompute-rating-prior")
+def recompute_rating_prior() -> None:
+    """Recompute the rating prior and the weighted rating of courses.
+
+    Schedule it periodically, e.g. every hour.
+    """
+    run_async(run_recompute_rating_prior(db_url=settings.DATABASE_URL))
+
+
+@app.command("recompute-recommendations")
+def recompute_recommendations(
+    full: bool = typer.Option(False, help="Rank every course, not only new ones."),
+) -> None:
+    """Recompute the students who took this course also took recommendations.
+
+    Schedule the incremental mode often and the full mode e.g. every night.
+
+    Args:
+        full: rank every course
+    """
+    run_async(run_recompute_recommendations(full=full, db_url=settings.DATABASE_URL))
+
+
+@app.command("decay-trending")
+def decay_trending() -> None:
+    """Decay the trending scores of courses by the time since the last run.
+
+    Schedule it periodically, e.g. every hour.
+    """
+    run_async(run_decay_trending(db_url=settings.DATABASE_URL))
+
+
+@app.command("rollup-analytics")
+def rollup_analytics(
+    interval: int = typer.Option(
+        settings.ANALYTICS_ROLLUP_INTERVAL, help="Seconds between rollups, 0 once."
+    ),
+) -> None:
+    """Catch up the teacher analytics rollups from the watermark.
+
+    Run a single instance of this command next to the workers.
+
+    Args:
+        interval: seconds between two rollups
+    """
+    run_async(run_rollup_analytics(interval=interval, db_url=settings.DATABASE_URL))
+
+
 if __name__ == "__main__":
     app()
@@ -0,0 +1,104 @@
+"""In-process metrics for Teached Project."""
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, DefaultDict, Dict, Iterator, Union
+
+from fastapi import APIRouter, Depends
+
+from .users.depends import is_superuser
+from .users.models import User
+
+Number = Union[int, float]
+
+
+class Metrics:
+    """Registry of counters and gauges for the current worker."""
+
+    def __init__(self: "Metrics") -> None:
+        """Set up empty registry."""
+        self.counters: DefaultDict[str, Number] = defaultdict(int)
+        self.gauges: Dict[str, Callable[[], Number]] = {}
+
+    def incr(self: "Metrics", name: str, value: Number = 1) -> None:
+        """Increment a counter.
+
+        Args:
+            name: The counter name.
+            value: How much to add.
+
+        Examples:
+            >>> from teached.metrics import Metrics
+            >>> metrics = Metrics()
+            >>> metrics.incr("cache.hits")
+            >>> metrics.incr("cache.hits", 2)
+            >>> metrics.collect()
+            {'cache.hits': 3}
+        """
+        self.counters[name] += value
+
+    def gauge(self: "Metrics", name: str, function: Callable[[], Number]) -> None:
+        """Register a gauge computed on collection.
+
+        Args:
+            name: The gauge name.
+            function: Callable that return the current value.
+
+        Examples:
+            >>> from teached.metrics import Metrics
+            >>> metrics = Metrics()
+            >>> metrics.gauge("queue.size", lambda: 7)
+            >>> metrics.collect()
+            {'queue.size': 7}
+        """
+        self.gauges[name] = function
+
+    @contextmanager
+    def timer(self: "Metrics", name: str) -> Iterator[None]:
+        """Time a block, adding to name.count and name.seconds counters.
+
+        Args:
+            name: The timer name.
+
+        Examples:
+            >>> from teached.metrics import Metrics
+            >>> metrics = Metrics()
+            >>> with metrics.timer("detail.course"):
+            ...     pass
+            >>> metrics.counters["detail.course.count"]
+            1
+
+        Yields:
+            Nothing, the block is timed.
+        """
+        start = time.perf_counter()
+
+        try:
+            yield
+
+        finally:
+            self.incr(f"{name}.count")
+            self.incr(f"{name}.seconds", time.perf_counter() - start)
+
+    def collect(self: "Metrics") -> Dict[str, Number]:
+        """Return the current value of every metric.
+
+        Returns:
+            Dict of metric name to value.
+        """
+        data = dict(self.counters)
+
+        data.update({name: function() for name, function in self.gauges.items()})
+
+        return dict(sorted(data.items()))
+
+
+metrics = Metrics()
+
+router = APIRouter()
+
+
+@router.get("/")
+async def metrics_list(auth_user: User = Depends(is_superuser)) -> Dict[str, Number]:
+    """Metrics of the current worker."""
+    return metrics.collect()
@@ -0,0 +1,492 @@
+"""Server-sent events pub/sub for Teached Project."""
+import asyncio
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import suppress
+from typing import (
+    Any,
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Optional,
+    Set,
+)
+
+from fastapi.encoders import jsonable_encoder
+
+from .metrics import metrics
+from .settings import logger, settings
+from .shortcuts import json_bytes
+
+Deliver = Callable[[str, bytes], None]
+
+
+def sse_frame(*, event: str, data: Any) -> bytes:
+    r"""Serialize a server-sent event.
+
+    Args:
+        event: The event type.
+        data: JSON compatible data.
+
+    Examples:
+        >>> from teached.notifications import sse_frame
+        >>> sse_frame(event="announcement", data={"title": "Python 101"})
+        b'event: announcement\ndata: {"title":"Python 101"}\n\n'
+
+    Returns:
+        The event frame.
+    """
+    return b"event: %s\ndata: %s\n\n" % (
+        event.encode("utf-8"),
+        json_bytes(jsonable_encoder(data)),
+    )
+
+
+class Transport(ABC):
+    """Base class for the transports that carry frames to the workers."""
+
+    @abstractmethod
+    async def start(self: "Transport", deliver: Deliver) -> None:
+        """Start receiving frames.
+
+        Args:
+            deliver: Callable that hands a channel frame to this worker.
+        """
+
+    @abstractmethod
+    async def stop(self: "Transport") -> None:
+        """Stop receiving frames."""
+
+    @abstractmethod
+    async def publish(self: "Transport", channel: str, frame: bytes) -> None:
+        """Send a frame to the subscribers of a channel in every worker.
+
+        Args:
+            channel: The channel.
+            frame: The serialized event.
+        """
+
+
+class MemoryTransport(Transport):
+    """Transport that only reaches the subscribers of this worker."""
+
+    def __init__(self: "MemoryTransport") -> None:
+        """Set up the transport."""
+        self._deliver: Optional[Deliver] = None
+
+    async def start(self: "MemoryTransport", deliver: Deliver) -> None:
+        """Start receiving frames.
+
+        Args:
+            deliver: Callable that hands a channel frame to this worker.
+        """
+        self._deliver = deliver
+
+    async def stop(self: "MemoryTransport") -> None:
+        """Stop receiving frames."""
+        self._deliver = None
+
+    async def publish(self: "MemoryTransport", channel: str, frame: bytes) -> None:
+        """Hand a frame to this worker.
+
+        Args:
+            channel: The channel.
+            frame: The serialized event.
+        """
+        if self._deliver is not None:
+            self._deliver(channel, frame)
+
+
+class RedisTransport(Transport):
+    """Transport that reaches every worker through redis pub/sub.
+
+    A dropped subscription is opened again, waiting twice as long after
+    every failed attempt, so the worker doesn't stay cut off from the others.
+    """
+
+    def __init__(
+        self: "RedisTransport",
+        *,
+        url: str,
+        prefix: str = "teached:events:",
+        name: str = "notifications",
+        retry_delay: float = 0.5,
+        max_retry_delay: float = 30,
+    ) -> None:
+        """Set up the transport, the connections are opened on start.
+
+        Args:
+            url: The redis URL.
+            prefix: Prefix of the redis channels.
+            name: Prefix of the transport metrics.
+            retry_delay: Seconds before the first resubscription attempt.
+            max_retry_delay: Longest wait between two attempts.
+        """
+        self.url = url
+        self.prefix = prefix
+        self.name = name
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._redis: Any = None
+        self._subscriber: Any = None
+        self._task: Optional["asyncio.Future[None]"] = None
+
+    async def start(self: "RedisTransport", deliver: Deliver) -> None:
+        """Subscribe to every channel of the prefix.
+
+        Args:
+            deliver: Callable that hands a channel frame to this worker.
+        """
+        import aioredis
+
+        self._redis = await aioredis.create_redis_pool(self.url)
+
+        channel = await self._subscribe()
+        self._task = asyncio.ensure_future(self._read(channel, deliver))
+
+    async def _subscribe(self: "RedisTransport") -> Any:
+        """Open the subscriber connection.
+
+        Returns:
+            The aioredis pattern channel.
+        """
+        import aioredis
+
+        self._subscriber = await aioredis.create_redis(self.url)
+
+        (channel,) = await self._subscriber.psubscribe(f"{self.prefix}*")
+
+        return channel
+
+    async def _read(self: "RedisTransport", channel: Any, deliver: Deliver) -> None:
+        """Deliver the received frames, subscribing again when dropped.
+
+        Args:
+            channel: The aioredis pattern channel.
+            deliver: Callable that hands a channel frame to this worker.
+        """
+        delay = self.retry_delay
+
+        while True:
+            if channel is not None:
+                delay = self.retry_delay
+
+                while await channel.wait_message():
+                    name, frame = await channel.get()
+
+                    try:
+                        deliver(name.decode("utf-8")[len(self.prefix) :], frame)
+
+                    except Exception as error:
+                        metrics.incr(f"{self.name}.failed")
+                        logger.error(f"Notification delivery failed: {error}")
+
+                self._subscriber.close()
+
+            metrics.incr(f"{self.name}.reconnects")
+            logger.warning(f"Notifications subscription lost, retry in {delay}s")
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+
+            try:
+                channel = await self._subscribe()
+
+            except Exception as error:
+                logger.error(f"Notifications subscription failed: {error}")
+                self._subscriber.close()
+                channel = None
+
+    async def stop(self: "RedisTransport") -> None:
+        """Close the connections."""
+        if self._task is not None:
+            self._task.cancel()
+
+            with suppress(asyncio.CancelledError):
+                await self._task
+
+            self._subscriber.close()
+            await self._subscriber.wait_closed()
+
+            self._redis.close()
+            await self._redis.wait_closed()
+
+            self._subscriber = self._redis = self._task = None
+
+    async def publish(self: "RedisTransport", channel: str, frame: bytes) -> None:
+        """Publish a frame to every worker.
+
+        Args:
+            channel: The channel.
+            frame: The serialized event.
+        """
+        await self._redis.publish(f"{self.prefix}{channel}", frame)
+
+
+def get_transport(*, url: str) -> Transport:
+    """Create transport from URL.
+
+    Args:
+        url: memory:// or redis:// URL.
+
+    Examples:
+        >>> from teached.notifications import get_transport
+        >>> type(get_transport(url="memory://")).__name__
+        'MemoryTransport'
+        >>> type(get_transport(url="redis://localhost:6379/0")).__name__
+        'RedisTransport'
+
+    Returns:
+        The transport.
+
+    Raises:
+        ValueError: If the URL scheme is not supported.
+    """
+    scheme = url.split("://", 1)[0]
+
+    if scheme == "memory":
+        return MemoryTransport()
+
+    if scheme in ("redis", "rediss"):
+        return RedisTransport(url=url)
+
+    raise ValueError(f"Unsupported notifications URL {url}")
+
+
+class Subscriber:
+    """A connected client and its bounded buffer of frames."""
+
+    __slots__ = ("channels", "frames", "waiter", "evicted")
+
+    def __init__(self: "Subscriber", *, channels: Set[str]) -> None:
+        """Set up the subscriber.
+
+        Args:
+            channels: The subscribed channels.
+        """
+        self.channels = channels
+        self.frames: Deque[bytes] = deque()
+        self.waiter: Optional["asyncio.Future[None]"] = None
+        self.evicted = False
+
+    def wake(self: "Subscriber") -> None:
+        """Resume the stream if it is waiting."""
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+
+class Hub:
+    """Broadcast frames to the subscribers of this worker, per channel.
+
+    A frame is serialized once by the publisher and the same bytes are
+    buffered for every subscriber of its channel. A subscriber that doesn't
+    keep up fills its buffer and is evicted, so it can neither hold memory
+    nor slow the others down. An idle stream holds no timer, one heartbeat
+    task wakes them all.
+    """
+
+    def __init__(
+        self: "Hub",
+        *,
+        transport: Transport,
+        queue_size: int,
+        heartbeat: float,
+        name: str,
+    ) -> None:
+        """Set up the hub.
+
+        Args:
+            transport: Carries the frames between workers.
+            queue_size: Frames buffered per subscriber.
+            heartbeat: Seconds between two comments of an idle stream.
+            name: Prefix of the hub metrics.
+        """
+        self.transport = transport
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.name = name
+        self.channels: Dict[str, Set[Subscriber]] = {}
+        self.subscribers: Set[Subscriber] = set()
+        self._task: Optional["asyncio.Future[None]"] = None
+
+        metrics.gauge(f"{name}.subscribers", lambda: len(self.subscribers))
+        metrics.gauge(f"{name}.channels", lambda: len(self.channels))
+
+    async def start(self: "Hub") -> None:
+        """Start receiving frames from the transport."""
+        await self.transport.start(self.deliver)
+
+        self._task = asyncio.ensure_future(self._beat())
+
+    async def stop(self: "Hub") -> None:
+        """Stop receiving frames and end every stream."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        await self.transport.stop()
+
+        for subscriber in list(self.subscribers):
+            self.evict(subscriber)
+
+    async def _beat(self: "Hub") -> None:
+        """Wake every stream up periodically."""
+        while True:
+            await asyncio.sleep(self.heartbeat)
+
+            for subscriber in list(self.subscribers):
+                subscriber.wake()
+
+    def subscribe(self: "Hub", channels: Iterable[str]) -> Subscriber:
+        """Subscribe a new client to channels.
+
+        Args:
+            channels: The channels.
+
+        Returns:
+            The subscriber.
+        """
+        subscriber = Subscriber(channels=set(channels))
+
+        for channel in subscriber.channels:
+            self.channels.setdefault(channel, set()).add(subscriber)
+
+        self.subscribers.add(subscriber)
+
+        return subscriber
+
+    def unsubscribe(self: "Hub", subscriber: Subscriber) -> None:
+        """Remove a subscriber from its channels.
+
+        Args:
+            subscriber: The subscriber.
+        """
+        for channel in subscriber.channels:
+            channel_subscribers = self.channels.get(channel)
+
+            if channel_subscribers is not None:
+                channel_subscribers.discard(subscriber)
+
+                if not channel_subscribers:
+                    del self.channels[channel]
+
+        self.subscribers.discard(subscriber)
+
+    def evict(self: "Hub", subscriber: Subscriber) -> None:
+        """Unsubscribe a client and end its stream.
+
+        Args:
+            subscriber: The subscriber.
+        """
+        subscriber.evicted = True
+        subscriber.frames.clear()
+        self.unsubscribe(subscriber)
+        subscriber.wake()
+
+    def deliver(self: "Hub", channel: str, frame: bytes) -> None:
+        """Buffer a frame for the subscribers of a channel in this worker.
+
+        Args:
+            channel: The channel.
+            frame: The serialized event.
+
+        Examples:
+            >>> from teached.notifications import Hub, MemoryTransport
+            >>> hub = Hub(
+            ...     transport=MemoryTransport(), queue_size=1, heartbeat=15, name="test"
+            ... )
+            >>> subscriber = hub.subscribe(["course:1"])
+            >>> hub.deliver("course:1", b"first")
+            >>> len(subscriber.frames), subscriber.evicted
+            (1, False)
+            >>> hub.deliver("course:1", b"second")
+            >>> len(subscriber.frames), subscriber.evicted, hub.channels
+            (0, True, {})
+        """
+        for subscriber in list(self.channels.get(channel, ())):
+            if len(subscriber.frames) >= self.queue_size:
+                metrics.incr(f"{self.name}.evicted")
+                self.evict(subscriber)
+
+                continue
+
+            subscriber.frames.append(frame)
+            subscriber.wake()
+
+        metrics.incr(f"{self.name}.delivered")
+
+    async def publish(self: "Hub", *, channel: str, event: str, data: Any) -> None:
+        """Publish an event to the subscribers of a channel in every worker.
+
+        Args:
+            channel: The channel.
+            event: The event type.
+            data: JSON compatible data.
+        """
+        await self.transport.publish(channel, sse_frame(event=event, data=data))
+        metrics.incr(f"{self.name}.published")
+
+    async def stream(
+        self: "Hub",
+        *,
+        channels: Iterable[str],
+        is_disconnected: Callable[[], Awaitable[bool]],
+    ) -> AsyncGenerator[bytes, None]:
+        """Stream the frames of channels to a client.
+
+        The client is subscribed when the stream starts and unsubscribed when
+        it ends. An idle stream sends a comment on every heartbeat, which
+        also checks the client is still connected. An evicted client
+        reconnects and gets what it missed from its inbox.
+
+        Args:
+            channels: The channels.
+            is_disconnected: Coroutine function that checks the client.
+
+        Yields:
+            Server-sent events frames.
+        """
+        subscriber = self.subscribe(channels)
+        loop = asyncio.get_event_loop()
+
+        try:
+            yield b": connected\n\n"
+
+            while True:
+                # evicted while the frames were being sent
+                if subscriber.evicted:
+                    return
+
+                if not subscriber.frames:
+                    subscriber.waiter = loop.create_future()
+                    await subscriber.waiter
+                    subscriber.waiter = None
+
+                if subscriber.evicted:
+                    return
+
+                if subscriber.frames:
+                    frames = b"".join(subscriber.frames)
+                    subscriber.frames.clear()
+
+                    yield frames
+
+                elif await is_disconnected():
+                    return
+
+                else:
+                    yield b": heartbeat\n\n"
+
+        finally:
+            self.unsubscribe(subscriber)
+
+
+notification_hub = Hub(
+    transport=get_transport(url=settings.NOTIFICATIONS_URL),
+    queue_size=settings.NOTIFICATIONS_QUEUE_SIZE,
+    heartbeat=settings.NOTIFICATIONS_HEARTBEAT,
+    name="notifications",
+)
@@ -0,0 +1,197 @@
+"""Cursor pagination for Teached Project."""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from tortoise import QuerySet
+from tortoise.fields import DatetimeField
+from tortoise.query_utils import Q
+
+
+def encode_cursor(*, created_at: datetime, id: Any) -> str:  # noqa: A002
+    """Encode the position of a row as an opaque cursor.
+
+    Args:
+        created_at: Creation time of the row.
+        id: Primary key of the row, to break ties.
+
+    Examples:
+        >>> from datetime import datetime
+        >>> from teached.pagination import decode_cursor, encode_cursor
+        >>> cursor = encode_cursor(created_at=datetime(2020, 6, 20, 10, 30), id=7)
+        >>> decode_cursor(cursor=cursor)
+        (datetime.datetime(2020, 6, 20, 10, 30), '7')
+
+    Returns:
+        URL safe cursor.
+    """
+    value = f"{created_at.isoformat()}|{id}".encode("utf-8")
+
+    return base64.urlsafe_b64encode(value).decode("ascii")
+
+
+def decode_cursor(*, cursor: str) -> Tuple[datetime, str]:
+    """Decode a cursor made by encode_cursor.
+
+    Args:
+        cursor: The cursor.
+
+    Returns:
+        Creation time and primary key of the row.
+
+    Raises:
+        HTTPException: If the cursor is not valid.
+    """
+    try:
+        created_at, row_id = (
+            base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        )
+
+        return datetime.fromisoformat(created_at), row_id
+
+    except ValueError as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        ) from error
+
+
+def encode_key_cursor(*, value: Any, id: Any) -> str:  # noqa: A002
+    """Encode the sort key of a row as an opaque cursor.
+
+    Args:
+        value: Value of the sort field of the row.
+        id: Primary key of the row, to break ties.
+
+    Examples:
+        >>> from teached.pagination import decode_key_cursor, encode_key_cursor
+        >>> decode_key_cursor(cursor=encode_key_cursor(value=4.5, id=7))
+        (4.5, '7')
+
+    Returns:
+        URL safe cursor.
+    """
+    value = json.dumps([jsonable_encoder(value), f"{id}"]).encode("utf-8")
+
+    return base64.urlsafe_b64encode(value).decode("ascii")
+
+
+def decode_key_cursor(*, cursor: str, is_datetime: bool = False) -> Tuple[Any, str]:
+    """Decode a cursor made by encode_key_cursor.
+
+    Args:
+        cursor: The cursor.
+        is_datetime: Whether the sort field is a datetime.
+
+    Returns:
+        Sort value and primary key of the row.
+
+    Raises:
+        HTTPException: If the cursor is not valid.
+    """
+    try:
+        value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+
+        return datetime.fromisoformat(value) if is_datetime else value, row_id
+
+    except (TypeError, ValueError) as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        ) from error
+
+
+def seek(
+    *, queryset: QuerySet, field: str, descending: bool, cursor: Optional[str] = None
+) -> QuerySet:
+    """Order rows by a field and their id, starting after the cursor row.
+
+    Like paginate, the rows are found with a range condition on (field, id),
+    with an index on field every page costs the same whatever its depth.
+
+    Args:
+        queryset: Rows to order.
+        field: The sort field.
+        descending: Whether the greatest values come first.
+        cursor: Cursor of the last row of the previous page.
+
+    Returns:
+        The ordered query set.
+    """
+    if cursor:
+        value, row_id = decode_key_cursor(
+            cursor=cursor,
+            is_datetime=isinstance(
+                queryset.model._meta.fields_map[field], DatetimeField
+            ),
+        )
+        after = "lt" if descending else "gt"
+
+        queryset = queryset.filter(
+            Q(**{f"{field}__{after}": value})
+            | Q(**{field: value, f"id__{after}": row_id})
+        )
+
+    order = "-" if descending else ""
+
+    return queryset.order_by(f"{order}{field}", f"{order}id")
+
+
+async def paginate(
+    *, queryset: QuerySet, limit: int, cursor: Optional[str] = None, **fields: str
+) -> Tuple[List[Dict], Optional[str]]:
+    """Fetch one page of rows, newest first.
+
+    The rows after the cursor are found with a range condition on
+    (created_at, id), so every page costs the same whatever its depth.
+
+    Args:
+        queryset: Rows to paginate, their model must have created_at.
+        limit: Page size.
+        cursor: Cursor returned with the previous page.
+        fields: Output keys mapped to the fields to project.
+
+    Returns:
+        The page and the cursor of the next page, None on the last one.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor=cursor)
+
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=row_id)
+        )
+
+    rows = (
+        await queryset.order_by("-created_at", "-id")
+        .limit(limit + 1)
+        .values("id", "created_at", **fields)
+    )
+
+    next_cursor = None
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(
+            created_at=rows[-1]["created_at"], id=rows[-1]["id"]
+        )
+
+    for row in rows:
+        del row["id"], row["created_at"]
+
+    return rows, next_cursor
+
+
+def set_next_link(
+    *, request: Request, response: Response, next_cursor: Optional[str]
+) -> None:
+    """Advertise the next page in a Link header.
+
+    Args:
+        request: Request object.
+        response: Response object.
+        next_cursor: Cursor of the next page, if any.
+    """
+    if next_cursor:
+        url = request.url.include_query_params(cursor=next_cursor)
+        response.headers["Link"] = f'<{url}>; rel="next"'
@@ -1,7 +1,7 @@
 """Settings for Teached Project."""
 import pathlib
 import sys
-from typing import List
+from typing import List, Optional
 
 from fastapi.security import OAuth2PasswordBearer
 from loguru import logger
@@ -62,6 +62,72 @@ class Settings(BaseSettings):
     # #maximum-password-lengths
     MAXIMUM_PASSWORD_LENGTH: int = 16
 
+    # Where the builder publishes the catalog snapshot that every worker
+    # maps read-only, leave it unset to always query the database.
+    CATALOG_SNAPSHOT_PATH: Optional[str] = None
+
+    CATALOG_SNAPSHOT_INTERVAL: int = 60
+
+    # memory:// keeps a cache per worker, redis://host:port/db shares it
+    # and needs the redis extra.
+    CACHE_URL: str = "memory://"
+
+    CACHE_TTL: int = 60
+
+    # The memory:// cache of a worker doesn't see the invalidations made by
+    # the other workers, its entries live at most this many seconds.
+    CACHE_LOCAL_TTL: int = 5
+
+    CACHE_MAX_ENTRIES: int = 1024
+
+    # Concurrent queries of one request, keep it below the DB pool size.
+    FAN_OUT_CONCURRENCY: int = 4
+
+    # Times a lecture completion retries the progress swap lost to concurrent
+    # completions of the same student before it answers 409.
+    PROGRESS_UPDATE_RETRIES: int = 5
+
+    # Rows per IN list or bulk insert statement of the bulk operations.
+    BULK_CHUNK_SIZE: int = 1000
+
+    # Lecture view events buffered per worker before new batches get a 503.
+    EVENTS_QUEUE_SIZE: int = 10000
+
+    # The buffer is flushed every EVENTS_BATCH_SIZE events or
+    # EVENTS_FLUSH_INTERVAL seconds, whichever comes first.
+    EVENTS_BATCH_SIZE: int = 500
+
+    EVENTS_FLUSH_INTERVAL: float = 1.0
+
+    # Rows younger than this many seconds are left to the next rollup, so
+    # the ones still in an open transaction are not skipped.
+    ANALYTICS_ROLLUP_LAG: int = 60
+
+    ANALYTICS_ROLLUP_INTERVAL: int = 300
+
+    # Neighbours kept for every course by the recommendations job.
+    RECOMMENDATION_COUNT: int = 10
+
+    # Students enrolled to more courses are left out of the co-enrollments,
+    # their pairs grow quadratically and say little about similarity.
+    RECOMMENDATION_MAX_BASKET: int = 200
+
+    # An incremental recommendations run that would reload more students
+    # than this runs as a full one instead.
+    RECOMMENDATION_MAX_INCREMENTAL_STUDENTS: int = 10000
+
+    # Seconds for an enrollment to weigh half as much in the trending order.
+    TRENDING_HALF_LIFE: int = 3 * 24 * 60 * 60
+
+    # memory:// reaches the streams of one worker, redis://host:port/db
+    # broadcasts the notifications to every worker.
+    NOTIFICATIONS_URL: str = "memory://"
+
+    # Notifications queued for a stream before the slow client is evicted.
+    NOTIFICATIONS_QUEUE_SIZE: int = 32
+
+    NOTIFICATIONS_HEARTBEAT: int = 15
+
     class Config:
         """Base Config for Settings."""
 
@@ -1,9 +1,13 @@
 """Shortcuts functions for Teached project."""
 import importlib
-from typing import Any
+import json
+from typing import Any, List
 
 from .settings import settings
 
+# Bound parameters of one statement, sqlite before 3.32 allows no more.
+MAX_QUERY_PARAMETERS = 999
+
 
 def get_user_model() -> Any:
     """Getting User Model."""
@@ -20,6 +24,100 @@ def get_model(*, path: str) -> Any:
     return getattr(importlib.import_module(module_name), class_name)
 
 
+def json_bytes(data: Any) -> bytes:
+    """Serialize data the same way the JSON responses do.
+
+    Args:
+        data: JSON compatible data.
+
+    Examples:
+        >>> from teached.shortcuts import json_bytes
+        >>> json_bytes({"title": "Python 101"})
+        b'{"title":"Python 101"}'
+
+    Returns:
+        JSON bytes.
+    """
+    return json.dumps(
+        data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+async def insert_or_ignore(instance: Any) -> bool:
+    """Insert a model instance unless it breaks a unique constraint.
+
+    The conflict is resolved by the database in the same statement, so there
+    is no read before the write and concurrent inserts can't both win.
+
+    Args:
+        instance: Unsaved model instance with a client side primary key.
+
+    Returns:
+        True if the row was inserted, False if it already existed.
+    """
+    return await insert_many_or_ignore([instance]) > 0
+
+
+async def insert_many_or_ignore(instances: List[Any]) -> int:
+    """Insert model instances, skipping the ones that break a unique constraint.
+
+    The rows are sent in multi-row statements, each one under the lowest
+    bound parameters limit of the supported databases.
+
+    Args:
+        instances: Unsaved instances of one model with client side primary keys.
+
+    Returns:
+        Number of inserted rows.
+    """
+    if not instances:
+        return 0
+
+    model = type(instances[0])
+    db = model._meta.db
+    executor = db.executor_class(model=model, db=db)
+    dialect = db.capabilities.dialect
+
+    fields = executor.regular_columns_all
+    columns = [model._meta.fields_db_projection[field] for field in fields]
+    rows_per_statement = max(1, MAX_QUERY_PARAMETERS // len(fields))
+
+    inserted = 0
+
+    for start in range(0, len(instances), rows_per_statement):
+        query = db.query_class.into(model._meta.basetable).columns(*columns)
+        values = []
+
+        for row, instance in enumerate(instances[start : start + rows_per_statement]):
+            query = query.insert(
+                *[executor.parameter(row * len(fields) + i) for i in range(len(fields))]
+            )
+            values += [
+                executor.column_map[field](getattr(instance, field), instance)
+                for field in fields
+            ]
+
+        sql = str(query)
+
+        if dialect == "mysql":
+            # INSERT IGNORE would also swallow NOT NULL, FK and truncation
+            # errors, the no-op update counts as 0 affected rows instead
+            pk = model._meta.db_pk_column
+            sql = f"{sql} ON DUPLICATE KEY UPDATE `{pk}`=`{pk}`"
+
+        elif dialect == "postgres":
+            # asyncpg counts the returned rows only
+            sql = f"{sql} ON CONFLICT DO NOTHING RETURNING 1"
+
+        else:
+            sql = f"{sql} ON CONFLICT DO NOTHING"
+
+        count, _ = await db.execute_query(sql, values)
+        inserted += count
+
+    return inserted
+
+
 def upload_to_dropbox(
     *, oauth2_token: str, file: bytes, filename: str, file_path: str
 ) -> None:
@@ -1,52 +1,59 @@
 """Collection of middleware."""
-from typing import Callable
+from typing import Callable, Dict
 
-from fastapi import Request, Response, status
+from fastapi import Request, status
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
 
 from . import models, utils
 
 
-class AuthJWTMiddleware(BaseHTTPMiddleware):
-    """JWT middleware."""
+class AuthJWTMiddleware:
+    """JWT middleware.
 
-    async def dispatch(
-        self: "BaseHTTPMiddleware", request: Request, call_next: Callable
-    ) -> Response:
-        """JWT middleware.
+    A plain ASGI middleware, the response is passed through untouched so
+    bodies such as the catalog snapshot view are sent without a copy.
+    """
 
-        Args:
-            request: Request object
-            call_next: callable function
+    def __init__(self: "AuthJWTMiddleware", app: Callable) -> None:
+        """Set up the middleware.
 
-        Returns:
-            Response object or  JSONResponse if the token is invalid
+        Args:
+            app: The ASGI app.
         """
-        authorization = request.headers.get("authorization")
+        self.app = app
 
-        if authorization and "Bearer" in authorization:
-            token_data = utils.verified_token(token=authorization.split(" ")[1])
-
-            if token_data:
+    async def __call__(
+        self: "AuthJWTMiddleware", scope: Dict, receive: Callable, send: Callable
+    ) -> None:
+        """Set the authenticated user of the request.
 
-                user = await models.User.get_or_none(id=token_data.id)
+        Args:
+            scope: ASGI scope.
+            receive: ASGI receive channel.
+            send: ASGI send channel.
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-                request.state.user = user
+        request = Request(scope)
+        request.state.user = None
 
-                response = await call_next(request)
+        authorization = request.headers.get("authorization")
 
-                return response
+        if authorization and "Bearer" in authorization:
+            token_data = utils.verified_token(token=authorization.split(" ")[1])
 
-            else:
-                return JSONResponse(
+            if not token_data:
+                response = JSONResponse(
                     content={"detail": "Invalid authentication credentials"},
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     headers={"WWW-Authenticate": "Bearer"},
                 )
+                await response(scope, receive, send)
+                return
 
-        request.state.user = None
-
-        response = await call_next(request)
+            if token_data.id:
+                request.state.user = await models.User.get_or_none(id=token_data.id)
 
-        return response
+        await self.app(scope, receive, send)
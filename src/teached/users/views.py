@@ -1,12 +1,22 @@
 """Views for users app."""
 from typing import Dict, Optional, Union
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Request,
+    Response,
+)
+from fastapi.encoders import jsonable_encoder
 from fastapi.security import OAuth2PasswordRequestForm
 from starlette import status
 from tortoise.contrib.fastapi import HTTPNotFoundError
 
+from teached.conditional import conditional_response
 from teached.settings import settings
+from teached.shortcuts import json_bytes
 
 from . import depends, schema, utils  # noqa: I202
 from .models import User, UserPersonalInfoPydantic, UserPydantic
@@ -51,9 +61,13 @@ async def sign_up(user_input: schema.User) -> Dict[str, str]:
     response_model=UserPydantic,
     responses={404: {"model": HTTPNotFoundError}},
 )
-async def get_user(username: str) -> UserPydantic:
+async def get_user(request: Request, username: str) -> UserPydantic:
     """Get user info."""
-    return await UserPydantic.from_queryset_single(User.get(username=username))
+    user = await UserPydantic.from_queryset_single(User.get(username=username))
+
+    return conditional_response(
+        request=request, body=json_bytes(jsonable_encoder(user))
+    )
 
 
 @router.patch(
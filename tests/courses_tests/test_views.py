@@ -0,0 +1,709 @@
+"""Test cases for the view module."""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Awaitable, Dict, Generator, List
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from fastapi.testclient import TestClient
+from tortoise import QuerySet
+from tortoise.contrib.test import finalizer, initializer
+
+from teached.cache import MemoryCache
+from teached.courses.analytics import rollup_course_stats
+from teached.courses.cache import course_cache
+from teached.courses.events import EventBuffer, lecture_events
+from teached.courses.models import (
+    Course,
+    CourseNeighbour,
+    Lecture,
+    LectureView,
+    RollupWatermark,
+    Section,
+)
+from teached.courses.recommendations import recompute_recommendations
+from teached.courses.services import (
+    TRENDING_WATERMARK,
+    backfill_lecture_ordinals,
+    complete_lecture,
+    decay_trending_scores,
+    enroll_to_published_course,
+)
+from teached.courses.utils import utc_now
+from teached.main import app
+from teached.settings import settings
+from teached.users.models import Student, Teacher, User
+from teached.users.utils import create_access_token
+
+
+@pytest.fixture()
+def client(monkeypatch: MonkeyPatch) -> Generator:
+    """Tortoise-orm fixture with an empty cache."""
+    monkeypatch.setattr(course_cache, "backend", MemoryCache())
+    initializer(modules=settings.DB_MODELS)
+    with TestClient(app) as c:
+        yield c
+    finalizer()
+
+
+@pytest.fixture()
+def event_loop(client: TestClient) -> Generator:
+    """Event loop."""
+    yield client.task.get_loop()
+
+
+async def create_course(slug: str = "python-101", is_drift: bool = False) -> Course:
+    """Creating course for test."""
+    user = await User.create(
+        username=f"teacher-{slug}", email=f"{slug}@e.com", password="!"  # noqa S106
+    )
+    teacher = await Teacher.create(user=user)
+
+    return await Course.create(
+        title="Python 101",
+        overview="Python 101",
+        level="beginner",
+        teacher=teacher,
+        slug=slug,
+        is_drift=is_drift,
+    )
+
+
+async def create_student(username: str = "student") -> Student:
+    """Creating student for test."""
+    user = await User.create(
+        username=username, email=f"{username}@e.com", password="!"  # noqa S106
+    )
+
+    return await Student.create(user=user)
+
+
+def auth_headers(user_id: object, username: str) -> Dict[str, str]:
+    """Authorization header for test."""
+    token = create_access_token(
+        data={"sub": username, "id": f"{user_id}"}, expires_in_minutes=5
+    )
+
+    return {"Authorization": f"Bearer {token.decode()}"}
+
+
+def student_headers(student: Student, username: str = "student") -> Dict[str, str]:
+    """Authorization header of a student for test."""
+    return auth_headers(student.user_id, username)
+
+
+async def teacher_headers(course: Course) -> Dict[str, str]:
+    """Authorization header of the course teacher for test."""
+    teacher = await Teacher.get(id=course.teacher_id).prefetch_related("user")
+
+    return auth_headers(teacher.user_id, teacher.user.username)
+
+
+def test_course_detail_ignores_if_modified_since(
+    client: TestClient, event_loop: asyncio.AbstractEventLoop
+) -> None:
+    """It exits with a status code of 200 after the counters change."""
+    course = event_loop.run_until_complete(create_course())
+
+    response = client.get("/courses/python-101/")
+    assert response.status_code == 200
+    assert "last-modified" not in response.headers
+    assert response.json()["enrollments"] == 0
+
+    student = event_loop.run_until_complete(create_student())
+    event_loop.run_until_complete(
+        enroll_to_published_course(slug=course.slug, student=student)
+    )
+
+    response = client.get(
+        "/courses/python-101/",
+        headers={"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"},
+    )
+    assert response.status_code == 200
+    assert response.json()["enrollments"] == 1
+
+
+def test_review_weighted_rating_without_prior(
+    client: TestClient, event_loop: asyncio.AbstractEventLoop
+) -> None:
+    """It keeps the fractional part of the weighted rating."""
+    course = event_loop.run_until_complete(create_course())
+
+    for username, rate in (("first", 4), ("second", 5)):
+        student = event_loop.run_until_complete(create_student(username))
+        headers = student_headers(student, username)
+
+        response = client.post("/courses/python-101/", headers=headers)
+        assert response.status_code == 201
+
+        response = client.post(
+            "/courses/python-101/review/",
+            json={"review": "Good", "rate": rate},
+            headers=headers,
+        )
+        assert response.status_code == 201
+
+    course = event_loop.run_until_complete(Course.get(id=course.id))
+    assert course.rating_sum == 9
+    assert course.review_count == 2
+    assert course.weighted_rating == 4.5
+
+
+def test_course_reviews_cursor_pagination(
+    client: TestClient, event_loop: asyncio.AbstractEventLoop
+) -> None:
+    """It follows the Link header through every review once, newest first."""
+    event_loop.run_until_complete(create_course())
+    usernames = [f"student-{index}" for index in range(5)]
+
+    for username in usernames:
+        student = event_loop.run_until_complete(create_student(username))
+        headers = student_headers(student, username)
+
+        client.post("/courses/python-101/", headers=headers)
+        response = client.post(
+            "/courses/python-101/review/",
+            json={"review": username, "rate": 5},
+            headers=headers,
+        )
+        assert response.status_code == 201
+
+    pages = []
+    url = "/courses/python-101/review/?limit=2"
+
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        pages.append([review["review"] for review in response.json()])
+        url = response.links.get("next", {}).get("url")
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [review for page in pages for review in page] == usernames[::-1]
+
+
+def test_review_invalidates_course_listing(
+    client: TestClient, event_loop: asyncio.AbstractEventLoop
+) -> None:
+    """It serves the new weighted rating in the cached listing."""
+    event_loop.run_until_complete(create_course())
+
+    response = client.get("/courses/?level=beginner")
+    assert response.status_code == 200
+    assert response.json()[0]["weighted_rating"] == 0
+
+    student = event_loop.run_until_complete(create_student())
+    headers = student_headers(student)
+    client.post("/courses/python-101/", headers=headers)
+    response = client.post(
+        "/courses/python-101/review/",
+        json={"review": "Good", "rate": 4},
+        headers=headers,
+    )
+    assert response.status_code == 201
+
+    response = client.get("/courses/?level=beginner")
+    assert response.json()[0]["weighted_rating"] == 4
+    assert response.json()[0]["rating_histogram"]["4"] == 1
+
+
+def test_cohort_enroll(
+    client: TestClient, event_loop: asyncio.AbstractEventLoop
+) -> None:
+    """It enrolls every student once and reports the unknown ones."""
+    course = event_loop.run_until_complete(create_course())
+    headers = event_loop.run_until_complete(teacher_headers(course))
+
+    first = event_loop.run_until_complete(create_student("first"))
+    second = event_loop.run_until_complete(create_student("second"))
+
+    response = client.post(
+        "/courses/python-101/", headers=student_headers(second, "second")
+    )
+    assert response.status_code == 201
+
+    response = client.post(
+        "/courses/python-101/manage/cohort/",
+        json={
+            "students": [
+                f"{first.user_id}".upper(),
+                "first",
+                f"{second.user_id}".replace("-", ""),
+                "ghost",
+            ]
+        },
+        headers=headers,
+    )
+    assert response.status_code == 201
+    assert response.json() == {"enrolled": 1, "skipped": 1, "unknown": ["ghost"]}
+
+    course = event_loop.run_until_complete(Course.get(id=course.id))
+    assert course.enrollment_count == 2
+
+
+def test_enroll_reads_publication_from_database(
+    client: TestClient, event_loop: asyncio.AbstractEventLoop
+) -> None:
+    """It exits with a status code of 404 once another worker unpublished."""
+    course = event_loop.run_until_complete(create_course())
+
+    first = event_loop.run_until_complete(create_student("first"))
+    response = client.post(
+        "/courses/python-101/", headers=student_headers(first, "first")
+    )
+    assert response.status_code == 201
+
+    # written by another worker, this worker cache is not invalidated
+    event_loop.run_until_complete(Course.filter(id=course.id).update(is_drift=True))
+
+    second = event_loop.run_until_complete(create_student("second"))
+    response = client.post(
+        "/courses/python-101/", headers=student_headers(second, "second")
+    )
+    assert response.status_code == 404
+
+
+def test_course_settings_invalidate_shared_ref(
+    client: TestClient, event_loop: asyncio.AbstractEventLoop, monkeypatch: MonkeyPatch,
+) -> None:
+    """It exits with a status code of 404 once the owner unpublished."""
+    monkeypatch.setattr(course_cache.backend, "shared", True)
+
+    course = event_loop.run_until_complete(create_course())
+    headers = event_loop.run_until_complete(teacher_headers(course))
+
+    first = event_loop.run_until_complete(create_student("first"))
+    response = client.post(
+        "/courses/python-101/", headers=student_headers(first, "first")
+    )
+    assert response.status_code == 201
+
+    response = client.patch(
+        "/courses/python-101/manage/settings/", json={"is_drift": True}, headers=headers
+    )
+    assert response.status_code == 200
+
+    second = event_loop.run_until_complete(create_student("second"))
+    response = client.post(
+        "/courses/python-101/", headers=student_headers(second, "second")
+    )
+    assert response.status_code == 404
+
+
+def test_lecture_complete_numbers_legacy_lectures(
+    client: TestClient, event_loop: asyncio.AbstractEventLoop
+) -> None:
+    """It sets the bit of every lecture, completed concurrently or not."""
+    course = event_loop.run_until_complete(create_course())
+    section = event_loop.run_until_complete(
+        Section.create(title="Intro", objective="Intro", course=course, order=1)
+    )
+
+    # created before the progress tracking, without ordinal
+    for order in range(1, 4):
+        event_loop.run_until_complete(
+            Lecture.create(
+                title=f"Lecture {order}", section=section, order=order, slug=f"l{order}"
+            )
+        )
+
+    student = event_loop.run_until_complete(create_student())
+    event_loop.run_until_complete(
+        enroll_to_published_course(slug=course.slug, student=student)
+    )
+
+    response = client.post(
+        "/my-classroom/python-101/lecture/l1/complete/",
+        headers=student_headers(student),
+    )
+    assert response.status_code == 200
+    assert response.json()["completed"] == 1
+
+    event_loop.run_until_complete(
+        asyncio.gather(
+            complete_lecture(slug=course.slug, lecture_slug="l2", student=student),
+            complete_lecture(slug=course.slug, lecture_slug="l3", student=student),
+            complete_lecture(slug=course.slug, lecture_slug="l3", student=student),
+        )
+    )
+
+    response = client.post(
+        "/my-classroom/python-101/lecture/l1/complete/",
+        headers=student_headers(student),
+    )
+    assert response.json() == {"completed": 3, "total": 3, "percent": 100.0}
+
+    ordinals = event_loop.run_until_complete(
+        Lecture.filter(section=section).values_list("ordinal", flat=True)
+    )
+    assert sorted(ordinals) == [0, 1, 2]
+
+
+def test_lecture_complete_gives_up_on_contention(
+    client: TestClient, event_loop: asyncio.AbstractEventLoop, monkeypatch: MonkeyPatch
+) -> None:
+    """It answers 409 once a concurrent completion won every progress swap."""
+    course = event_loop.run_until_complete(create_course())
+    section = event_loop.run_until_complete(
+        Section.create(title="Intro", objective="Intro", course=course, order=1)
+    )
+    event_loop.run_until_complete(
+        Lecture.create(title="Intro", section=section, order=1, ordinal=0, slug="l1")
+    )
+
+    student = event_loop.run_until_complete(create_student())
+    event_loop.run_until_complete(
+        enroll_to_published_course(slug=course.slug, student=student)
+    )
+
+    swaps = []
+
+    def lose_swap(self: QuerySet, **kwargs: str) -> Awaitable[int]:
+        swaps.append(kwargs)
+        return asyncio.sleep(0, result=0)
+
+    monkeypatch.setattr(QuerySet, "update", lose_swap)
+
+    response = client.post(
+        "/my-classroom/python-101/lecture/l1/complete/",
+        headers=student_headers(student),
+    )
+    assert response.status_code == 409
+    assert len(swaps) == settings.PROGRESS_UPDATE_RETRIES + 1
+
+
+def test_backfill_lecture_ordinals(
+    client: TestClient, event_loop: asyncio.AbstractEventLoop
+) -> None:
+    """It numbers the lectures without ordinal after the reserved ones."""
+    course = event_loop.run_until_complete(create_course())
+    section = event_loop.run_until_complete(
+        Section.create(title="Intro", objective="Intro", course=course, order=1)
+    )
+
+    event_loop.run_until_complete(
+        Lecture.create(title="New", section=section, order=1, ordinal=0)
+    )
+    event_loop.run_until_complete(Course.filter(id=course.id).update(lecture_count=1))
+    event_loop.run_until_complete(
+        Lecture.create(title="Legacy", section=section, order=2)
+    )
+
+    assert event_loop.run_until_complete(backfill_lecture_ordinals()) == 1
+
+    legacy = event_loop.run_until_complete(Lecture.get(title="Legacy"))
+    course = event_loop.run_until_complete(Course.get(id=course.id))
+    assert (legacy.ordinal, course.lecture_count) == (1, 2)
+
+
+def test_course_analytics_buckets_rolled_up_rows(
+    client: TestClient, event_loop: asyncio.AbstractEventLoop, monkeypatch: MonkeyPatch
+) -> None:
+    """It counts the folded enrollments in the current UTC bucket."""
+    monkeypatch.setattr(settings, "ANALYTICS_ROLLUP_LAG", 0)
+    course = event_loop.run_until_complete(create_course())
+    student = event_loop.run_until_complete(create_student())
+    event_loop.run_until_complete(
+        enroll_to_published_course(slug=course.slug, student=student)
+    )
+
+    assert event_loop.run_until_complete(rollup_course_stats()) == 1
+    assert event_loop.run_until_complete(rollup_course_stats()) == 0
+
+    response = client.get(
+        "/courses/python-101/manage/analytics/?period=hour&span=2",
+        headers=event_loop.run_until_complete(teacher_headers(course)),
+    )
+    assert response.status_code == 200
+    buckets = response.json()["buckets"]
+    assert [bucket["enrollments"] for bucket in buckets] == [0, 1]
+    assert response.json()["totals"]["enrollments"] == 1
+
+
+async def create_lecture(course: Course, title: str = "Intro") -> Lecture:
+    """Creating lecture for test."""
+    section = await Section.create(title=title, objective=title, course=course, order=1)
+
+    return await Lecture.create(title=title, section=section, order=1)
+
+
+def view_event(lecture: Lecture) -> Dict:
+    """Lecture view event for test."""
+    return {
+        "lecture_id": f"{lecture.id}",
+        "event": "opened",
+        "occurred_at": "2020-06-20T10:30:00",
+    }
+
+
+def test_lecture_events_of_enrolled_courses(
+    client: TestClient, event_loop: asyncio.AbstractEventLoop
+) -> None:
+    """It accepts the events and only writes those of enrolled courses."""
+    course = event_loop.run_until_complete(create_course())
+    other = event_loop.run_until_complete(create_course(slug="other-101"))
+    lecture = event_loop.run_until_complete(create_lecture(course))
+    other_lecture = event_loop.run_until_complete(create_lecture(other, "Other"))
+    student = event_loop.run_until_complete(create_student())
+    event_loop.run_until_complete(
+        enroll_to_published_course(slug=course.slug, student=student)
+    )
+
+    response = client.post(
+        "/my-classroom/events/",
+        json={"events": [view_event(lecture), view_event(other_lecture)]},
+        headers=student_headers(student),
+    )
+    assert response.status_code == 202
+    assert response.json() == {"accepted": 2}
+
+    while lecture_events.depth():
+        event_loop.run_until_complete(lecture_events.flush())
+
+    views = event_loop.run_until_complete(LectureView.all().values("lecture_id"))
+    assert [f"{view['lecture_id']}" for view in views] == [f"{lecture.id}"]
+
+
+def test_lecture_events_backpressure(
+    client: TestClient, event_loop: asyncio.AbstractEventLoop, monkeypatch: MonkeyPatch
+) -> None:
+    """It rejects the whole batch with 503 when the buffer is full."""
+    monkeypatch.setattr(lecture_events, "maxsize", 1)
+    course = event_loop.run_until_complete(create_course())
+    lecture = event_loop.run_until_complete(create_lecture(course))
+    student = event_loop.run_until_complete(create_student())
+
+    response = client.post(
+        "/my-classroom/events/",
+        json={"events": [view_event(lecture), view_event(lecture)]},
+        headers=student_headers(student),
+    )
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert lecture_events.depth() == 0
+
+
+def test_event_buffer_flushes_by_size_time_and_on_stop(
+    client: TestClient, event_loop: asyncio.AbstractEventLoop
+) -> None:
+    """It flushes full batches, old events and what is left on stop."""
+    course = event_loop.run_until_complete(create_course())
+    lecture = event_loop.run_until_complete(create_lecture(course))
+    student = event_loop.run_until_complete(create_student())
+    event_loop.run_until_complete(
+        enroll_to_published_course(slug=course.slug, student=student)
+    )
+    event = {
+        "lecture_id": lecture.id,
+        "student_id": student.id,
+        "event": "opened",
+        "occurred_at": datetime(2020, 6, 20, 10, 30),
+    }
+
+    async def run() -> List[int]:
+        counts = []
+
+        buffer = EventBuffer(name="test", maxsize=10, batch_size=2, interval=60)
+        await buffer.start()
+
+        buffer.put_many([event, event])
+        await asyncio.sleep(0.1)
+        counts.append(await LectureView.all().count())
+
+        buffer.put_many([event])
+        await asyncio.sleep(0.1)
+        counts.append(await LectureView.all().count())
+
+        await buffer.stop()
+        counts.append(await LectureView.all().count())
+
+        buffer = EventBuffer(name="test", maxsize=10, batch_size=2, interval=0.05)
+        await buffer.start()
+
+        buffer.put_many([event])
+        await asyncio.sleep(0.2)
+        counts.append(await LectureView.all().count())
+
+        await buffer.stop()
+
+        return counts
+
+    assert event_loop.run_until_complete(run()) == [2, 2, 3, 4]
+
+
+def stored_neighbours(event_loop: asyncio.AbstractEventLoop) -> Dict:
+    """Stored neighbours by course slug for test."""
+    rows = event_loop.run_until_complete(
+        CourseNeighbour.all().values(
+            "shared", "score", course="course__slug", neighbour="neighbour__slug"
+        )
+    )
+
+    return {
+        (row["course"], row["neighbour"]): (row["shared"], round(row["score"], 4))
+        for row in rows
+    }
+
+
+def test_recompute_recommendations(
+    client: TestClient, event_loop: asyncio.AbstractEventLoop, monkeypatch: MonkeyPatch
+) -> None:
+    """It ranks every course, then only the courses of the new students."""
+    monkeypatch.setattr(settings, "ANALYTICS_ROLLUP_LAG", 0)
+
+    courses = {
+        slug: event_loop.run_until_complete(create_course(slug=slug))
+        for slug in ("a", "b", "c", "d", "e")
+    }
+    students = {}
+
+    for username, slugs in (
+        ("s1", "ab"),
+        ("s2", "ab"),
+        ("s3", "ac"),
+        ("s4", "de"),
+    ):
+        students[username] = event_loop.run_until_complete(create_student(username))
+
+        for slug in slugs:
+            event_loop.run_until_complete(
+                enroll_to_published_course(slug=slug, student=students[username])
+            )
+
+    assert event_loop.run_until_complete(recompute_recommendations(full=True)) == 5
+    assert stored_neighbours(event_loop) == {
+        ("a", "b"): (2, 0.8165),
+        ("a", "c"): (1, 0.5774),
+        ("b", "a"): (2, 0.8165),
+        ("c", "a"): (1, 0.5774),
+        ("d", "e"): (1, 1.0),
+        ("e", "d"): (1, 1.0),
+    }
+
+    assert event_loop.run_until_complete(recompute_recommendations(full=False)) == 0
+
+    event_loop.run_until_complete(
+        enroll_to_published_course(slug="b", student=students["s3"])
+    )
+    # only the courses of s3 are ranked again, d and e keep their rows
+    event_loop.run_until_complete(
+        CourseNeighbour.filter(course_id=courses["d"].id).delete()
+    )
+
+    assert event_loop.run_until_complete(recompute_recommendations(full=False)) == 3
+    assert stored_neighbours(event_loop) == {
+        ("a", "b"): (3, 1.0),
+        ("a", "c"): (1, 0.5774),
+        ("b", "a"): (3, 1.0),
+        ("b", "c"): (1, 0.5774),
+        ("c", "a"): (1, 0.5774),
+        ("c", "b"): (1, 0.5774),
+        ("e", "d"): (1, 1.0),
+    }
+
+
+def test_recompute_recommendations_falls_back_to_full(
+    client: TestClient, event_loop: asyncio.AbstractEventLoop, monkeypatch: MonkeyPatch
+) -> None:
+    """It ranks every course when the new students reach too many others."""
+    monkeypatch.setattr(settings, "ANALYTICS_ROLLUP_LAG", 0)
+
+    courses = {
+        slug: event_loop.run_until_complete(create_course(slug=slug))
+        for slug in ("a", "b", "d", "e")
+    }
+
+    for username, slugs in (("s1", "ab"), ("s2", "ab"), ("s4", "de")):
+        student = event_loop.run_until_complete(create_student(username))
+
+        for slug in slugs:
+            event_loop.run_until_complete(
+                enroll_to_published_course(slug=slug, student=student)
+            )
+
+    event_loop.run_until_complete(recompute_recommendations(full=True))
+    event_loop.run_until_complete(
+        CourseNeighbour.filter(course_id=courses["d"].id).delete()
+    )
+
+    student = event_loop.run_until_complete(create_student("s5"))
+    event_loop.run_until_complete(enroll_to_published_course(slug="a", student=student))
+    monkeypatch.setattr(settings, "RECOMMENDATION_MAX_INCREMENTAL_STUDENTS", 1)
+
+    assert event_loop.run_until_complete(recompute_recommendations(full=False)) == 4
+    assert set(stored_neighbours(event_loop)) == {
+        ("a", "b"),
+        ("b", "a"),
+        ("d", "e"),
+        ("e", "d"),
+    }
+
+
+def sorted_slugs(client: TestClient, url: str) -> List[List[str]]:
+    """Slugs of every page of a sorted listing for test."""
+    pages = []
+
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        pages.append([course["slug"] for course in response.json()])
+        url = response.links.get("next", {}).get("url")
+
+    return pages
+
+
+def test_course_list_sorted_pages(
+    client: TestClient, event_loop: asyncio.AbstractEventLoop
+) -> None:
+    """It follows the Link header through the sorted courses once each."""
+    counts = {"a": 3, "b": 1, "c": 3, "d": 0, "e": 2}
+    ids = {}
+
+    for slug, count in counts.items():
+        course = event_loop.run_until_complete(create_course(slug=slug))
+        event_loop.run_until_complete(
+            Course.filter(id=course.id).update(enrollment_count=count)
+        )
+        ids[slug] = f"{course.id}"
+
+    event_loop.run_until_complete(create_course(slug="drift", is_drift=True))
+
+    popular = sorted(counts, key=lambda slug: (counts[slug], ids[slug]), reverse=True)
+
+    pages = sorted_slugs(client, "/courses/?sort=popular&limit=2")
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [slug for page in pages for slug in page] == popular
+
+    pages = sorted_slugs(client, "/courses/?sort=newest&limit=2")
+    assert [slug for page in pages for slug in page] == ["e", "d", "c", "b", "a"]
+
+
+def test_decay_trending_scores(
+    client: TestClient, event_loop: asyncio.AbstractEventLoop
+) -> None:
+    """It halves the scores every half life and resets the tiny ones."""
+    course = event_loop.run_until_complete(create_course(slug="hot"))
+    event_loop.run_until_complete(Course.filter(id=course.id).update(trending_score=8))
+    tiny = event_loop.run_until_complete(create_course(slug="cold"))
+    event_loop.run_until_complete(
+        Course.filter(id=tiny.id).update(trending_score=0.015)
+    )
+
+    assert event_loop.run_until_complete(decay_trending_scores()) == 1
+
+    event_loop.run_until_complete(
+        RollupWatermark.filter(name=TRENDING_WATERMARK).update(
+            value=utc_now() - timedelta(seconds=settings.TRENDING_HALF_LIFE)
+        )
+    )
+
+    assert round(event_loop.run_until_complete(decay_trending_scores()), 2) == 0.5
+
+    scores = dict(
+        event_loop.run_until_complete(
+            Course.all().values_list("slug", "trending_score")
+        )
+    )
+    assert (round(scores["hot"], 2), scores["cold"]) == (4, 0)
+
+    pages = sorted_slugs(client, "/courses/?sort=trending&limit=1")
+    assert pages == [["hot"], ["cold"]]
@@ -1,4 +1,6 @@
 """Test cases for the manage module."""
+import pathlib
+
 from typer.testing import CliRunner
 
 from teached.manage import app
@@ -30,3 +32,56 @@ def test_create_superuser_succeeds() -> None:
     )
     assert result.exit_code == 0
     assert "teached hes been created" in result.stdout
+
+
+def test_build_catalog_snapshot_succeeds(tmp_path: pathlib.Path) -> None:
+    """It exits with a status code of zero."""
+    path = tmp_path / "catalog.snapshot"
+    result = runner.invoke(
+        app, ["build-catalog-snapshot", "--path", f"{path}", "--interval", "0"]
+    )
+    assert result.exit_code == 0
+    assert "generation 1 has been published" in result.stdout
+    assert path.read_bytes().endswith(b"[]")
+
+
+def test_recompute_aggregates_succeeds() -> None:
+    """It exits with a status code of zero."""
+    result = runner.invoke(app, ["recompute-aggregates"])
+    assert result.exit_code == 0
+    assert "aggregates of 0 courses have been recomputed" in result.stdout
+
+
+def test_recompute_rating_prior_succeeds() -> None:
+    """It exits with a status code of zero."""
+    result = runner.invoke(app, ["recompute-rating-prior"])
+    assert result.exit_code == 0
+    assert "rating prior is 0.0 weighted by 0.0" in result.stdout
+
+
+def test_rollup_analytics_succeeds() -> None:
+    """It exits with a status code of zero."""
+    result = runner.invoke(app, ["rollup-analytics", "--interval", "0"])
+    assert result.exit_code == 0
+    assert "0 rows have been folded into the rollups" in result.stdout
+
+
+def test_recompute_recommendations_succeeds() -> None:
+    """It exits with a status code of zero."""
+    result = runner.invoke(app, ["recompute-recommendations", "--full"])
+    assert result.exit_code == 0
+    assert "recommendations of 0 courses have been recomputed" in result.stdout
+
+
+def test_decay_trending_succeeds() -> None:
+    """It exits with a status code of zero."""
+    result = runner.invoke(app, ["decay-trending"])
+    assert result.exit_code == 0
+    assert "trending scores have been decayed by 1" in result.stdout
+
+
+def test_backfill_lecture_ordinals_succeeds() -> None:
+    """It exits with a status code of zero."""
+    result = runner.invoke(app, ["backfill-lecture-ordinals"])
+    assert result.exit_code == 0
+    assert "0 lectures have been numbered" in result.stdout
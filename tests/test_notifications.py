@@ -0,0 +1,185 @@
+"""Test cases for the notifications module."""
+import asyncio
+from typing import List, Tuple, Union
+
+from teached.notifications import Hub, MemoryTransport, RedisTransport
+
+
+def create_hub(queue_size: int = 8, heartbeat: float = 15) -> Hub:
+    """Creating hub for test."""
+    return Hub(
+        transport=MemoryTransport(),
+        queue_size=queue_size,
+        heartbeat=heartbeat,
+        name="test",
+    )
+
+
+def test_stream_receives_published_frames() -> None:
+    """It sends the frames of the subscribed channels and unsubscribes on close."""
+
+    async def run() -> List[bytes]:
+        hub = create_hub()
+        await hub.start()
+
+        async def is_disconnected() -> bool:
+            return False
+
+        stream = hub.stream(channels=["course:1"], is_disconnected=is_disconnected)
+        frames = [await stream.__anext__()]
+
+        await hub.publish(channel="course:2", event="announcement", data={"id": 2})
+        await hub.publish(channel="course:1", event="announcement", data={"id": 1})
+        frames.append(await asyncio.wait_for(stream.__anext__(), timeout=1))
+
+        await stream.aclose()
+        assert hub.subscribers == set()
+        assert hub.channels == {}
+
+        await hub.stop()
+
+        return frames
+
+    frames = asyncio.new_event_loop().run_until_complete(run())
+
+    assert frames == [
+        b": connected\n\n",
+        b'event: announcement\ndata: {"id":1}\n\n',
+    ]
+
+
+def test_stream_heartbeat_ends_on_disconnect() -> None:
+    """It sends a heartbeat to an idle client and ends once it is gone."""
+
+    async def run() -> List[bytes]:
+        hub = create_hub(heartbeat=0.01)
+        await hub.start()
+        checks = []
+
+        async def is_disconnected() -> bool:
+            checks.append(True)
+            return len(checks) > 1
+
+        frames = [
+            frame
+            async for frame in hub.stream(
+                channels=["course:1"], is_disconnected=is_disconnected
+            )
+        ]
+
+        assert hub.subscribers == set()
+        await hub.stop()
+
+        return frames
+
+    frames = asyncio.new_event_loop().run_until_complete(
+        asyncio.wait_for(run(), timeout=5)
+    )
+
+    assert frames == [b": connected\n\n", b": heartbeat\n\n"]
+
+
+def test_stream_of_evicted_client_ends() -> None:
+    """It ends the stream of a client whose buffer is full."""
+
+    async def run() -> List[bytes]:
+        hub = create_hub(queue_size=1)
+        await hub.start()
+
+        async def is_disconnected() -> bool:
+            return False
+
+        stream = hub.stream(channels=["course:1"], is_disconnected=is_disconnected)
+        frames = [await stream.__anext__()]
+
+        await hub.publish(channel="course:1", event="announcement", data={"id": 1})
+        await hub.publish(channel="course:1", event="announcement", data={"id": 2})
+        frames.extend([frame async for frame in stream])
+
+        await hub.stop()
+
+        return frames
+
+    frames = asyncio.new_event_loop().run_until_complete(run())
+
+    assert frames == [b": connected\n\n"]
+
+
+class FakeChannel:
+    """Pattern channel of a connection that drops after its messages."""
+
+    def __init__(
+        self: "FakeChannel", messages: List[Tuple[bytes, bytes]], drop: bool
+    ) -> None:
+        """Set up channel for test."""
+        self.messages = messages
+        self.drop = drop
+
+    async def wait_message(self: "FakeChannel") -> bool:
+        """Wait for the next message."""
+        if not self.messages and not self.drop:
+            await asyncio.Event().wait()
+        return bool(self.messages)
+
+    async def get(self: "FakeChannel") -> Tuple[bytes, bytes]:
+        """Get the next message."""
+        return self.messages.pop(0)
+
+
+class FakeRedis:
+    """Redis connection for test."""
+
+    def close(self: "FakeRedis") -> None:
+        """Close the connection."""
+
+    async def wait_closed(self: "FakeRedis") -> None:
+        """Wait for the connection to close."""
+
+
+def test_redis_transport_subscribes_again() -> None:
+    """It keeps delivering after a failed delivery and a dropped subscription."""
+
+    async def run() -> List[Tuple[str, bytes]]:
+        transport = RedisTransport(url="redis://", retry_delay=0.01)
+        transport._redis = FakeRedis()
+        transport._subscriber = FakeRedis()
+        channels: List[Union[Exception, FakeChannel]] = [
+            ConnectionError("refused"),
+            FakeChannel([(b"teached:events:course:1", b"second")], drop=False),
+        ]
+
+        async def subscribe() -> FakeChannel:
+            channel = channels.pop(0)
+            if isinstance(channel, Exception):
+                raise channel
+            return channel
+
+        transport._subscribe = subscribe  # type: ignore
+        delivered = []
+
+        def deliver(channel: str, frame: bytes) -> None:
+            if frame == b"broken":
+                raise ValueError(frame)
+            delivered.append((channel, frame))
+
+        first = FakeChannel(
+            [
+                (b"teached:events:course:1", b"broken"),
+                (b"teached:events:course:2", b"first"),
+            ],
+            drop=True,
+        )
+        transport._task = asyncio.ensure_future(transport._read(first, deliver))
+
+        while len(delivered) < 2:
+            await asyncio.sleep(0.01)
+
+        await transport.stop()
+
+        return delivered
+
+    delivered = asyncio.new_event_loop().run_until_complete(
+        asyncio.wait_for(run(), timeout=5)
+    )
+
+    assert delivered == [("course:2", b"first"), ("course:1", b"second")]
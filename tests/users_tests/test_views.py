@@ -130,6 +130,19 @@ def test_user_detail_succeeds(
     assert response.status_code == 200
 
 
+def test_user_detail_not_modified(
+    client: TestClient, event_loop: asyncio.AbstractEventLoop
+) -> None:
+    """It exits with a status code of 304."""
+    event_loop.run_until_complete(create_user())
+
+    etag = client.get("/users/teached/").headers["etag"]
+
+    response = client.get("/users/teached/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+
 def test_user_detail_fail(client: TestClient) -> None:
     """It exits with a status code of 404."""
     response = client.get("/users/teached/")